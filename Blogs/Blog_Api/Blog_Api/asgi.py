@@ -2,6 +2,9 @@
 ASGI config for Blog_Api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve through this (e.g. GUNICORN_WORKER_CLASS=asgi) for the async
+/api/public/posts/stream/ SSE endpoint; under WSGI (including runserver) that
+endpoint answers 503 rather than tie up a worker per open stream.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
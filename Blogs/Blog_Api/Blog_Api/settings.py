@@ -12,15 +12,18 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
-from dotenv import load_dotenv
-load_dotenv()
 import environ
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 env = environ.Env()
-environ.Env.read_env()
+
+# Read the .env file once per process (next to manage.py, or next to this file)
+for env_file in (BASE_DIR / '.env', Path(__file__).resolve().parent / '.env'):
+    if env_file.exists():
+        environ.Env.read_env(env_file)
+        break
 
 
 # Quick-start development settings - unsuitable for production
@@ -161,3 +164,47 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Post view counters (see Post/counters.py)
+VIEW_COUNT_FLUSH_INTERVAL = 10  # seconds; bounds the views lost if a worker crashes
+VIEW_COUNT_MAX_PENDING = 1000   # distinct posts buffered before an early flush
+MOST_VIEWED_POSTS_MAX = 50
+
+# Post archiving (see Post/archive.py and `manage.py archive_posts`)
+POST_ARCHIVE_APPROVED_AFTER_DAYS = 365 * 2
+POST_ARCHIVE_REJECTED_AFTER_DAYS = 30
+POST_ARCHIVE_CHUNK_SIZE = 500
+
+# Batch fetch (GET/POST /api/public/posts/batch/)
+PUBLIC_POST_BATCH_MAX = 100
+
+# Moderation queue leases (see Post/moderation.py)
+MODERATION_CLAIM_LEASE = datetime.timedelta(minutes=15)
+MODERATION_CLAIM_DEFAULT = 50
+MODERATION_CLAIM_MAX = 200
+
+# Public change feed (see Post/changes.py)
+CHANGE_FEED_PAGE_SIZE = 500
+CHANGE_FEED_SETTLE_SECONDS = 5      # hold back rows this recent so late commits aren't skipped
+CHANGE_FEED_TOMBSTONE_DAYS = 90     # older cursors get 410 and must resync
+
+# Server-Sent Events stream of approved posts (see Post/events.py)
+POST_EVENT_BROKER = 'Post.events.DatabaseBroker'
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 5000
+SSE_POLL_INTERVAL = 1        # seconds between PostEvent polls, per worker
+SSE_EVENT_SETTLE_SECONDS = 1 # hold back events this recent so late commits aren't skipped
+SSE_EVENT_RETENTION = datetime.timedelta(hours=24)  # how far back Last-Event-ID can resume
+SSE_REPLAY_BUFFER = 1000     # events kept for Last-Event-ID resume (InMemoryBroker)
+SSE_SUBSCRIBER_QUEUE = 100   # per-connection backlog before a slow client is dropped
+
+# Chunked user removal (see User/purge.py and `manage.py purge_users`)
+USER_PURGE_BATCH_SIZE = 200
+
+# Bulk user provisioning (see User/provisioning.py and `manage.py provision_users`)
+# Per API request; each password hash takes ~0.4 s of CPU, so this stays well inside the
+# 30 s worker timeout even on one core. Larger files go through the command, which has no limit
+BULK_PROVISION_MAX_ROWS = 50
+
+# Compressed post bodies (see Post/compression.py and `manage.py compress_post_content`)
+POST_CONTENT_COMPRESSION_THRESHOLD = 2048  # bytes of UTF-8; shorter bodies stay plain text
+POST_CONTENT_CODEC = 'zlib'                # or 'zstd' (Python 3.14+ or the zstandard package)
@@ -0,0 +1,86 @@
+# posts/archive.py
+"""
+Hot/archive partitioning of posts.
+
+Old APPROVED posts and long-REJECTED posts are moved from Post into
+ArchivedPost in small transactions, so the table the feeds scan stays
+roughly the size of the live working set however much total volume grows.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+
+from .models import Post, ArchivedPost
+
+# Columns copied verbatim between the two tables (content stays in its stored, possibly compressed, form)
+ARCHIVED_FIELDS = (
+    'id', 'title', 'content', 'content_compressed', 'author_id', 'status', 'created_at', 'updated_at', 'view_count',
+)
+
+
+def archivable_posts(approved_after_days=None, rejected_after_days=None):
+    """
+    Posts due for archiving: APPROVED and created before the cutoff, or REJECTED and untouched for N days.
+    A restored post is only due once the same period has passed since its restore.
+    """
+    if approved_after_days is None:
+        approved_after_days = settings.POST_ARCHIVE_APPROVED_AFTER_DAYS
+    if rejected_after_days is None:
+        rejected_after_days = settings.POST_ARCHIVE_REJECTED_AFTER_DAYS
+
+    now = timezone.now()
+    approved_cutoff = now - timedelta(days=approved_after_days)
+    rejected_cutoff = now - timedelta(days=rejected_after_days)
+    return Post.objects.filter(
+        Q(status='APPROVED', created_at__lt=approved_cutoff)
+        & (Q(restored_at__isnull=True) | Q(restored_at__lt=approved_cutoff))
+        | Q(status='REJECTED', updated_at__lt=rejected_cutoff)
+        & (Q(restored_at__isnull=True) | Q(restored_at__lt=rejected_cutoff))
+    )
+
+
+def archive_posts(approved_after_days=None, rejected_after_days=None, chunk_size=None, progress=None):
+    """ Move archivable posts into ArchivedPost, one chunk per transaction. Returns the number moved. """
+    chunk_size = chunk_size or settings.POST_ARCHIVE_CHUNK_SIZE
+    queryset = archivable_posts(approved_after_days, rejected_after_days)
+
+    moved = 0
+    while True:
+        with transaction.atomic():
+            posts = list(queryset.select_for_update().order_by('id')[:chunk_size])
+            if not posts:
+                break
+            ArchivedPost.objects.bulk_create([
+                ArchivedPost(**{field: getattr(post, field) for field in ARCHIVED_FIELDS})
+                for post in posts
+            ])
+            Post.objects.filter(id__in=[post.id for post in posts]).delete()
+
+        moved += len(posts)
+        if progress:
+            progress(moved)
+    return moved
+
+
+def restore_posts(ids):
+    """ Move archived posts back into Post. Returns the restored Post objects. """
+    with transaction.atomic():
+        archived = list(ArchivedPost.objects.select_for_update().filter(id__in=ids))
+        if not archived:
+            return []
+
+        posts = Post.objects.bulk_create([
+            Post(**{field: getattr(row, field) for field in ARCHIVED_FIELDS})
+            for row in archived
+        ])
+        # bulk_create applies auto_now_add; put the original creation dates back. restored_at
+        # keeps the next archive run from moving them straight back
+        Post.objects.filter(id__in=[row.id for row in archived]).update(
+            created_at=Case(*[When(id=row.id, then=Value(row.created_at)) for row in archived]),
+            restored_at=timezone.now(),
+        )
+        ArchivedPost.objects.filter(id__in=[row.id for row in archived]).delete()
+    return posts
@@ -0,0 +1,130 @@
+# posts/changes.py
+"""
+Incremental change feed for public posts.
+
+A cursor records how far a client has read two streams: APPROVED posts by
+(updated_at, id) and PostTombstone rows by (removed_at, id). Rows newer than
+CHANGE_FEED_SETTLE_SECONDS are held back so a transaction that commits late
+with an older timestamp is not skipped. A page never reads further in time
+in one stream than in the other.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Post, PostTombstone
+
+
+class InvalidCursor(ValueError):
+    """ The cursor could not be decoded. """
+
+
+class CursorExpired(Exception):
+    """ The cursor is older than the tombstone retention window; the client must do a full sync. """
+
+
+def record_tombstones(post_ids, reason):
+    """ Log posts that left the public feed, so change feed clients drop them. """
+    now = timezone.now()
+    PostTombstone.objects.bulk_create([
+        PostTombstone(post_id=post_id, reason=reason, removed_at=now) for post_id in post_ids
+    ])
+
+
+def prune_tombstones(older_than_days=None):
+    """ Drop tombstones past the retention window. Returns the number deleted. """
+    if older_than_days is None:
+        older_than_days = settings.CHANGE_FEED_TOMBSTONE_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = PostTombstone.objects.filter(removed_at__lt=cutoff).delete()
+    return deleted
+
+
+def encode_cursor(position):
+    raw = json.dumps({
+        key: [stamp.isoformat(), row_id] for key, (stamp, row_id) in position.items()
+    })
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """ Turn a cursor string back into {'posts': (datetime, id), 'tombstones': (datetime, id)}. """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        position = {}
+        for key in ('posts', 'tombstones'):
+            stamp, row_id = data[key]
+            parsed = parse_datetime(stamp)
+            if parsed is None or timezone.is_naive(parsed):
+                raise ValueError(stamp)
+            position[key] = (parsed, int(row_id))
+        return position
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def _after(queryset, field, position):
+    # Keyset condition: (field, id) > position
+    if position is None:
+        return queryset
+    stamp, row_id = position
+    return queryset.filter(Q(**{f'{field}__gt': stamp}) | Q(**{field: stamp, 'id__gt': row_id}))
+
+
+def get_changes(cursor=None, limit=None):
+    """
+    Posts approved or edited, and tombstones written, since ``cursor``.
+    Clients should apply ``deleted`` before ``posts``: a post rejected and then approved again shows up in both.
+    """
+    limit = limit or settings.CHANGE_FEED_PAGE_SIZE
+    position = decode_cursor(cursor) if cursor else {'posts': None, 'tombstones': None}
+
+    now = timezone.now()
+    oldest_tombstone = now - timedelta(days=settings.CHANGE_FEED_TOMBSTONE_DAYS)
+    if position['tombstones'] and position['tombstones'][0] < oldest_tombstone:
+        raise CursorExpired("Cursor is older than the tombstone retention window")
+
+    settled = now - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+    posts = list(
+        _after(Post.objects.filter(status='APPROVED', updated_at__lte=settled), 'updated_at', position['posts'])
+        .select_related('author')
+        .order_by('updated_at', 'id')[:limit]
+    )
+    if cursor is None:
+        # A fresh client has nothing to delete; it only needs tombstones from now on
+        tombstones = []
+    else:
+        tombstones = list(
+            _after(PostTombstone.objects.filter(removed_at__lte=settled), 'removed_at', position['tombstones'])
+            .order_by('removed_at', 'id')[:limit]
+        )
+
+    has_more = len(posts) == limit or len(tombstones) == limit
+
+    # A short page means the stream was read up to the settle point, so the
+    # cursor can move there (this also keeps idle cursors inside the retention window)
+    posts_end = (posts[-1].updated_at, posts[-1].id) if len(posts) == limit else (settled, 0)
+    tombstones_end = (tombstones[-1].removed_at, tombstones[-1].id) if len(tombstones) == limit else (settled, 0)
+
+    # Neither stream may run ahead of the other: a post rejected and then approved again
+    # must not be sent as approved on this page while its older tombstone waits for a later one
+    horizon = min(posts_end[0], tombstones_end[0])
+    if posts_end[0] > horizon:
+        posts = [post for post in posts if post.updated_at < horizon]
+        posts_end = (horizon, 0)
+    if tombstones_end[0] > horizon:
+        tombstones = [tombstone for tombstone in tombstones if tombstone.removed_at < horizon]
+        tombstones_end = (horizon, 0)
+
+    return {
+        'posts': posts,
+        'tombstones': tombstones,
+        'cursor': encode_cursor({'posts': posts_end, 'tombstones': tombstones_end}),
+        'has_more': has_more,
+    }
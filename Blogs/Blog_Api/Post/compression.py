@@ -0,0 +1,69 @@
+# posts/compression.py
+"""
+Codecs for compressed post bodies.
+
+A stored blob is one codec byte followed by the compressed UTF-8 text, so
+rows written under different POST_CONTENT_CODEC settings can be read side
+by side. zstd needs Python 3.14's compression.zstd or the ``zstandard``
+package; zlib is always available.
+"""
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from compression import zstd as _zstd  # Python 3.14+
+
+    def _zstd_compress(data, level):
+        return _zstd.compress(data, level=level)
+
+    _zstd_decompress = _zstd.decompress
+except ImportError:
+    try:
+        import zstandard as _zstandard
+
+        def _zstd_compress(data, level):
+            return _zstandard.ZstdCompressor(level=level).compress(data)
+
+        def _zstd_decompress(data):
+            return _zstandard.ZstdDecompressor().decompress(data)
+    except ImportError:
+        _zstd_compress = _zstd_decompress = None
+
+CODECS = {
+    # name: (tag, default level)
+    'zlib': (b'z', 6),
+    'zstd': (b's', 3),
+}
+
+
+def available_codecs():
+    return [name for name in CODECS if name != 'zstd' or _zstd_compress is not None]
+
+
+def compress(text, codec=None, level=None):
+    """ UTF-8 encode and compress ``text``; returns the tagged blob. """
+    codec = codec or settings.POST_CONTENT_CODEC
+    if codec not in available_codecs():
+        raise ImproperlyConfigured(f"Post content codec {codec!r} is not available")
+    tag, default_level = CODECS[codec]
+    level = default_level if level is None else level
+
+    data = text.encode('utf-8')
+    if codec == 'zstd':
+        return tag + _zstd_compress(data, level)
+    return tag + zlib.compress(data, level)
+
+
+def decompress(blob):
+    """ Inverse of compress(). """
+    blob = bytes(blob)  # some backends hand back a memoryview
+    tag, payload = blob[:1], blob[1:]
+    if tag == CODECS['zlib'][0]:
+        return zlib.decompress(payload).decode('utf-8')
+    if tag == CODECS['zstd'][0]:
+        if _zstd_decompress is None:
+            raise ImproperlyConfigured("Post content was stored with zstd, which is not installed")
+        return _zstd_decompress(payload).decode('utf-8')
+    raise ValueError(f"Unknown post content codec tag {tag!r}")
@@ -0,0 +1,104 @@
+# posts/counters.py
+"""
+Write-buffered view counters.
+
+Views are accumulated in per-worker memory and written out periodically as
+batched ``F()`` UPDATEs, so a read does not turn into a write. A crash loses
+at most the views buffered since the last flush (VIEW_COUNT_FLUSH_INTERVAL).
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = Counter()
+_flusher_pid = None
+
+
+def record_view(post_id):
+    """ Buffer one view of a post. Only writes when the buffer is full, and never raises on a failed write. """
+    with _lock:
+        _pending[post_id] += 1
+        pending_posts = len(_pending)
+
+    _ensure_flusher()
+
+    # Don't let a burst of distinct posts grow the buffer without bound
+    if pending_posts >= settings.VIEW_COUNT_MAX_PENDING:
+        try:
+            flush_views()
+        except Exception:
+            # The views were put back for the next flush; don't fail the read over it
+            logger.exception("Failed to flush buffered view counts")
+
+
+def flush_views():
+    """ Write buffered views to the DB, one UPDATE per distinct increment. Returns the number of views written. """
+    global _pending
+    with _lock:
+        if not _pending:
+            return 0
+        pending, _pending = _pending, Counter()
+
+    from .models import Post
+
+    # Posts with the same increment share a single UPDATE ... WHERE id IN (...)
+    by_increment = {}
+    for post_id, count in pending.items():
+        by_increment.setdefault(count, []).append(post_id)
+
+    written = 0
+    groups = list(by_increment.items())
+    for index, (count, post_ids) in enumerate(groups):
+        try:
+            Post.objects.filter(id__in=post_ids).update(view_count=F('view_count') + count)
+        except Exception:
+            # Put back everything that was not written so the next flush retries it
+            with _lock:
+                for retry_count, retry_ids in groups[index:]:
+                    for post_id in retry_ids:
+                        _pending[post_id] += retry_count
+            raise
+        written += count * len(post_ids)
+    return written
+
+
+def _ensure_flusher():
+    # One flusher thread per process; a forked worker starts its own
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    threading.Thread(target=_run_flusher, name='view-count-flusher', daemon=True).start()
+
+
+def _run_flusher():
+    while True:
+        time.sleep(settings.VIEW_COUNT_FLUSH_INTERVAL)
+        try:
+            flush_views()
+        except Exception:
+            logger.exception("Failed to flush buffered view counts")
+        finally:
+            close_old_connections()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        flush_views()
+    except Exception:
+        logger.exception("Failed to flush buffered view counts on exit")
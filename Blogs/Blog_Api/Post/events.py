@@ -0,0 +1,327 @@
+# posts/events.py
+"""
+Post event brokers for the Server-Sent Events stream.
+
+Views publish from ordinary (sync) request threads; subscribers are SSE
+connections waiting on the ASGI event loop. A broker fans each event out to
+every subscriber and replays what a reconnecting client missed since its
+``Last-Event-ID``.
+
+POST_EVENT_BROKER selects the implementation. DatabaseBroker goes through the
+PostEvent table, so every worker sees every event under one id sequence.
+InMemoryBroker only reaches subscribers in its own process; it is for the
+tests and single-process development servers.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# DatabaseBroker prunes expired events once every this many publishes
+PRUNE_EVERY = 100
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    data: dict
+
+
+class Subscription:
+    """ One connected client. Events are delivered on the loop the subscription was made on. """
+
+    def __init__(self, broker, queue_size):
+        self.broker = broker
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        # While a replay is being read, live events are held here so they queue after it
+        self.backlog = None
+
+    def deliver(self, event):
+        # Runs on self.loop
+        if self.closed:
+            return
+        if self.backlog is not None:
+            self.backlog.append(event)
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow to keep up: disconnect it, the client resumes with Last-Event-ID
+            self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+            # Wake up the reader so it can end the stream
+            while True:
+                try:
+                    self.queue.put_nowait(None)
+                    break
+                except asyncio.QueueFull:
+                    self.queue.get_nowait()
+
+    async def get(self):
+        """ Next event, or None once the subscription is closed. """
+        return await self.queue.get()
+
+
+class BaseBroker:
+    """ Interface for post event brokers. """
+
+    def publish(self, event_type, data):
+        """ Send an event to every subscriber. Safe to call from any thread. """
+        raise NotImplementedError
+
+    def subscribe(self, last_event_id=None):
+        """
+        Register a subscriber on the running event loop and return it.
+        Events after ``last_event_id`` are queued first; if they are no longer
+        available a single 'resync' event is queued instead.
+        """
+        raise NotImplementedError
+
+    async def asubscribe(self, last_event_id=None):
+        """ subscribe() for async callers; brokers that read the database to replay override it. """
+        return self.subscribe(last_event_id)
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """ In-process broker: fans out to this worker's connections only. For tests and single-process servers. """
+
+    def __init__(self, replay_size=None, queue_size=None):
+        self.replay_size = replay_size or settings.SSE_REPLAY_BUFFER
+        self.queue_size = queue_size or settings.SSE_SUBSCRIBER_QUEUE
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=self.replay_size)
+        self._subscribers = set()
+        self._next_id = 1
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = Event(self._next_id, event_type, data)
+            self._next_id += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Its event loop has shut down
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, last_event_id=None):
+        subscription = Subscription(self, self.queue_size)
+        with self._lock:
+            # Replay and registration happen under one lock: no gap, no duplicates
+            if last_event_id is not None:
+                missed = [event for event in self._history if event.id > last_event_id]
+                oldest = self._history[0].id if self._history else self._next_id
+                # Too old for the buffer, or from before this broker (re)started
+                if last_event_id < oldest - 1 or last_event_id >= self._next_id:
+                    missed = [Event(self._next_id - 1, 'resync', {})]
+                for event in missed[:self.queue_size]:
+                    subscription.queue.put_nowait(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+
+class _Hub:
+    """ The DatabaseBroker subscribers of one event loop, fed by one polling task. """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.position = None  # id of the last event handed to the subscribers
+        self.ready = None
+        self.task = None
+
+
+class DatabaseBroker(BaseBroker):
+    """
+    Broker backed by the PostEvent table, so events reach the connections of every worker.
+
+    Event ids are the table's primary key: one sequence for the whole deployment, so a
+    Last-Event-ID resume works whichever worker the client reconnects to. Each event loop
+    runs a single polling task for all of its connections. Rows younger than
+    SSE_EVENT_SETTLE_SECONDS are held back, along with everything after them, so an
+    insert that commits after a higher id is not skipped.
+    """
+
+    def __init__(self, poll_interval=None, settle_seconds=None, queue_size=None, retention=None):
+        self.poll_interval = settings.SSE_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.settle = timedelta(
+            seconds=settings.SSE_EVENT_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        )
+        self.queue_size = queue_size or settings.SSE_SUBSCRIBER_QUEUE
+        self.retention = retention or settings.SSE_EVENT_RETENTION
+        self._lock = threading.Lock()
+        self._hubs = {}  # event loop -> _Hub
+        self._published = 0
+
+    def publish(self, event_type, data):
+        from .models import PostEvent
+
+        row = PostEvent.objects.create(type=event_type, data=data)
+        with self._lock:
+            self._published += 1
+            prune = self._published % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        return Event(row.id, row.type, row.data)
+
+    def prune(self):
+        """ Delete events older than SSE_EVENT_RETENTION; clients further behind get a 'resync'. """
+        from .models import PostEvent
+
+        return PostEvent.objects.filter(created_at__lt=timezone.now() - self.retention).delete()[0]
+
+    def subscribe(self, last_event_id=None):
+        raise NotImplementedError("DatabaseBroker replays from the database: use asubscribe()")
+
+    async def asubscribe(self, last_event_id=None):
+        hub = await self._hub()
+        subscription = Subscription(self, self.queue_size)
+        if last_event_id is None:
+            hub.subscribers.add(subscription)
+            return subscription
+
+        # Register before reading the replay, so nothing published meanwhile is lost
+        subscription.backlog = []
+        hub.subscribers.add(subscription)
+        upto = hub.position
+        missed, oldest = await sync_to_async(self._replay)(last_event_id, upto)
+        # Pruned away, from another database, or more than the client could queue anyway
+        pruned = last_event_id < upto and (oldest is None or oldest > last_event_id + 1)
+        if pruned or last_event_id > upto or len(missed) >= self.queue_size:
+            missed = [Event(upto, 'resync', {})]
+        backlog, subscription.backlog = subscription.backlog, None
+        for event in missed + backlog:
+            subscription.deliver(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        hub = self._hubs.get(subscription.loop)
+        if hub is not None:
+            hub.subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return sum(len(hub.subscribers) for hub in list(self._hubs.values()))
+
+    async def _hub(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            hub = self._hubs.setdefault(loop, _Hub())
+        if hub.task is None or hub.task.done():
+            hub.ready = asyncio.Event()
+            # A fresh context: the poller outlives the request that happened to start it
+            hub.task = loop.create_task(self._poll(hub), context=contextvars.Context())
+        await hub.ready.wait()
+        return hub
+
+    async def _poll(self, hub):
+        try:
+            hub.position = await sync_to_async(self._latest_id)()
+        finally:
+            hub.ready.set()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not hub.subscribers:
+                # The next subscriber starts a new poller from the then-latest event
+                return
+            try:
+                events = await sync_to_async(self._fetch)(hub.position)
+            except Exception:
+                logger.exception("Could not poll post events")
+                continue
+            for event in events:
+                hub.position = event.id
+                for subscription in list(hub.subscribers):
+                    subscription.deliver(event)
+
+    def _latest_id(self):
+        from .models import PostEvent
+
+        return PostEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    def _fetch(self, position):
+        from .models import PostEvent
+
+        settled = timezone.now() - self.settle
+        try:
+            rows = list(PostEvent.objects.filter(id__gt=position).order_by('id')[:self.queue_size])
+        except Exception:
+            # Most likely a dropped connection: reconnect on the next poll
+            connection.close()
+            raise
+        events = []
+        for row in rows:
+            if row.created_at > settled:
+                break
+            events.append(Event(row.id, row.type, row.data))
+        return events
+
+    def _replay(self, last_event_id, upto):
+        from .models import PostEvent
+
+        oldest = PostEvent.objects.order_by('id').values_list('id', flat=True).first()
+        rows = PostEvent.objects.filter(id__gt=last_event_id, id__lte=upto).order_by('id')[:self.queue_size]
+        return [Event(row.id, row.type, row.data) for row in rows], oldest
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """ The process-wide broker configured by POST_EVENT_BROKER. """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.POST_EVENT_BROKER)()
+    return _broker
+
+
+def format_sse(event):
+    """ Serialise an event in text/event-stream format. """
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data, default=str)}\n\n"
+
+
+def publish_post_approved(post_id):
+    """ Announce a newly approved post to stream subscribers. Call after the approval is committed. """
+    from .models import Post
+    from .serializers import PublicPostSerializer
+
+    post = Post.objects.select_related('author').filter(id=post_id, status='APPROVED').first()
+    if post is not None:
+        get_broker().publish('post.approved', PublicPostSerializer(post).data)
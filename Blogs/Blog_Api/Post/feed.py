@@ -0,0 +1,132 @@
+# posts/feed.py
+"""
+Filtering and ordering for the public post feed.
+
+Every accepted combination maps onto one composite index (see FEED_INDEXES
+and Post.Meta.indexes): the status equality, then an optional author
+equality, then the single column used for both the range filter and the
+ordering. Requests that would need a second range column or a sort the
+index can't provide are rejected rather than falling back to a filesort.
+
+    ?author=<id>
+    ?created_after=&created_before=    (ISO date or datetime)
+    ?updated_after=&updated_before=
+    ?title_prefix=                     (prefix match in the column's collation)
+    ?ordering=created_at|-created_at|updated_at|-updated_at
+"""
+import datetime
+import sys
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Post
+
+ORDERINGS = ('created_at', '-created_at', 'updated_at', '-updated_at')
+
+# (filtered by author?, column) -> index serving that query
+FEED_INDEXES = {
+    (False, 'created_at'): 'post_status_created_idx',
+    (False, 'updated_at'): 'post_status_updated_idx',
+    (False, 'title'): 'post_status_title_idx',
+    (True, 'created_at'): 'post_status_author_created_idx',
+    (True, 'updated_at'): 'post_status_author_updated_idx',
+    (True, 'title'): 'post_status_author_title_idx',
+}
+
+
+def _parse_moment(name, value):
+    try:
+        moment = parse_datetime(value)
+        day = parse_date(value) if moment is None else None
+    except ValueError:
+        # Well formed but not a real date, e.g. 2024-13-45
+        raise ValidationError({name: "Expected an ISO 8601 date or datetime"})
+    if moment is None:
+        if day is None:
+            raise ValidationError({name: "Expected an ISO 8601 date or datetime"})
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, datetime.timezone.utc)
+    return moment
+
+
+def _prefix_upper_bound(prefix):
+    """
+    Smallest string, in code point order, greater than every string starting with ``prefix``,
+    or None if there is none (the prefix is all U+10FFFF).
+    """
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return None
+    following = ord(stem[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        # Surrogates can't be stored; skip to the next real code point
+        following = 0xE000
+    return stem[:-1] + chr(following)
+
+
+def feed_plan(params):
+    """ Validate feed query params. Returns (filters, order_by, index name). """
+    filters = {}
+
+    author = params.get('author')
+    if author:
+        try:
+            filters['author_id'] = int(author)
+        except ValueError:
+            raise ValidationError({"author": "Expected a user id"})
+
+    ranges = []
+    for column in ('created_at', 'updated_at'):
+        after, before = params.get(f"{column[:-3]}_after"), params.get(f"{column[:-3]}_before")
+        if after:
+            filters[f'{column}__gte'] = _parse_moment(f"{column[:-3]}_after", after)
+        if before:
+            filters[f'{column}__lt'] = _parse_moment(f"{column[:-3]}_before", before)
+        if after or before:
+            ranges.append(column)
+
+    prefix = params.get('title_prefix')
+    if prefix:
+        if connection.vendor == 'mysql':
+            # MySQL turns LIKE 'prefix%' into an index range itself, in the column's collation. A
+            # code point bound would be wrong there: in utf8mb4_0900_ai_ci 'z' + 1 = '{' sorts before 'a'.
+            # istartswith, because startswith compiles to LIKE BINARY, which ignores the collation
+            filters['title__istartswith'] = prefix
+        else:
+            # Elsewhere LIKE may not use the index; a range in code point order does
+            upper = _prefix_upper_bound(prefix)
+            if upper is None:
+                raise ValidationError({"title_prefix": "Prefix must contain a character other than U+10FFFF"})
+            filters['title__gte'] = prefix
+            filters['title__lt'] = upper
+        ranges.append('title')
+
+    if len(ranges) > 1:
+        raise ValidationError({"detail": "Only one of the created, updated and title_prefix filters can be used at a time"})
+
+    ordering = params.get('ordering')
+    if ordering and ordering not in ORDERINGS:
+        raise ValidationError({"ordering": f"Must be one of {', '.join(ORDERINGS)}"})
+
+    if ranges:
+        column = ranges[0]
+        if ordering and ordering.lstrip('-') != column:
+            raise ValidationError({"ordering": f"Not supported together with the {column} filter"})
+        ordering = ordering or ('title' if column == 'title' else f'-{column}')
+    else:
+        ordering = ordering or '-created_at'
+        column = ordering.lstrip('-')
+
+    # id breaks ties; InnoDB secondary indexes already end in the primary key
+    tiebreak = '-id' if ordering.startswith('-') else 'id'
+    return filters, (ordering, tiebreak), FEED_INDEXES[('author_id' in filters, column)]
+
+
+def public_feed(params):
+    """ APPROVED posts filtered and ordered by the request's query params. """
+    filters, order_by, _ = feed_plan(params)
+    return Post.objects.filter(status='APPROVED', **filters).select_related('author').order_by(*order_by)
@@ -0,0 +1,366 @@
+# posts/loadtest.py
+"""
+In-process mixed-workload load generator.
+
+Requests go through the real URLconf, middleware and views via Django's
+test clients (WSGI handler, or ASGI handler with AsyncClient), against a
+seeded test database. Scenarios live in Post/loadtest_scenarios/*.json and
+carry a version. Reports record that version and a hash of the scenario
+file, so runs are only compared like for like.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections, connection
+from django.test import AsyncClient, Client
+from django.utils import timezone
+
+from User.models import User
+from User.views import get_jwt_token
+from .models import Post
+
+SCENARIO_DIR = Path(__file__).resolve().parent / 'loadtest_scenarios'
+PASSWORD = 'loadtest-password'
+
+
+def load_scenario(name_or_path):
+    """ Load a scenario by name (from SCENARIO_DIR) or by path. """
+    path = Path(name_or_path)
+    if not path.suffix:
+        path = SCENARIO_DIR / f'{name_or_path}.json'
+    raw = path.read_bytes()
+    scenario = json.loads(raw)
+    unknown = set(scenario['mix']) - set(ROUTES)
+    if unknown:
+        raise ValueError(f"Unknown routes in scenario: {', '.join(sorted(unknown))}")
+    scenario['sha256'] = hashlib.sha256(raw).hexdigest()
+    return scenario
+
+
+# --- Seeding ---
+
+@dataclass
+class SeedState:
+    """ Ids and tokens the routes draw from, shared by all workers. """
+    authors: list = field(default_factory=list)   # (email, token)
+    admin_tokens: list = field(default_factory=list)
+    approved_ids: list = field(default_factory=list)
+    claimed_by_token: dict = field(default_factory=dict)   # admin token -> ids it holds a lease on
+    posts_by_token: dict = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def seed_database(seed, rng):
+    """ Bulk-insert users and posts for a run. One password hash is shared by every user. """
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        [User(email=f'author{i}@loadtest.local', name=f'Author {i}', role='AUTHOR', password=password)
+         for i in range(seed['authors'])]
+        + [User(email=f'admin{i}@loadtest.local', name=f'Admin {i}', role='ADMIN', password=password)
+           for i in range(seed['admins'])]
+    )
+    # bulk_create doesn't return ids on every backend
+    users = list(User.objects.filter(email__endswith='@loadtest.local').order_by('id'))
+    authors = [user for user in users if user.role == 'AUTHOR']
+
+    posts = [
+        Post(
+            title=f'Load test post {author.id}-{i}',
+            content='Lorem ipsum dolor sit amet. ' * rng.randint(5, 80),
+            author=author,
+            status='APPROVED' if rng.random() < seed['approved_ratio'] else 'PENDING',
+        )
+        for author in authors
+        for i in range(seed['posts_per_author'])
+    ]
+    # bulk_create skips save(), which is where long bodies get compressed
+    for post in posts:
+        post.pack_content()
+    Post.objects.bulk_create(posts, batch_size=500)
+
+    state = SeedState()
+    tokens = {user.id: get_jwt_token(user) for user in users}
+    for user in users:
+        if user.role == 'ADMIN':
+            state.admin_tokens.append(tokens[user.id])
+            state.claimed_by_token[tokens[user.id]] = []
+        else:
+            state.authors.append((user.email, tokens[user.id]))
+            state.posts_by_token[tokens[user.id]] = []
+
+    for post_id, author_id, post_status in Post.objects.values_list('id', 'author_id', 'status'):
+        state.posts_by_token[tokens[author_id]].append(post_id)
+        if post_status == 'APPROVED':
+            state.approved_ids.append(post_id)
+    return state
+
+
+# --- Routes ---
+# Each route picks its inputs from the shared state and returns
+# (method, path, body, token, on_success, on_failure). on_success(response_json) and
+# on_failure() update the state.
+
+def public_list(state, rng):
+    return 'GET', '/api/public/posts/', None, None, None, None
+
+
+def public_detail(state, rng):
+    return 'GET', f'/api/public/posts/{rng.choice(state.approved_ids)}/', None, None, None, None
+
+
+def public_batch(state, rng):
+    ids = rng.sample(state.approved_ids, min(10, len(state.approved_ids)))
+    return 'GET', f"/api/public/posts/batch/?ids={','.join(map(str, ids))}", None, None, None, None
+
+
+def author_create(state, rng):
+    _, token = rng.choice(state.authors)
+
+    def on_success(data):
+        # It joins the moderation queue; admins pick it up through admin_claim
+        with state.lock:
+            state.posts_by_token[token].append(data['post']['id'])
+
+    body = {'title': f'New post {rng.random()}', 'content': 'Fresh content. ' * 20}
+    return 'POST', '/api/posts/', body, token, on_success, None
+
+
+def author_update(state, rng):
+    _, token = rng.choice(state.authors)
+    with state.lock:
+        post_id = rng.choice(state.posts_by_token[token])
+    body = {'title': f'Edited {rng.random()}', 'content': 'Edited content. ' * 20}
+    return 'PUT', f'/api/posts/{post_id}/', body, token, None, None
+
+
+def login(state, rng):
+    email, _ = rng.choice(state.authors)
+    return 'POST', '/api/auth/login/', {'email': email, 'password': PASSWORD}, None, None, None
+
+
+def admin_approve(state, rng):
+    # Like a moderator, an admin decides posts it has claimed, so other admins' leases don't get in
+    # the way. With no claims outstanding, re-decide an approved post (those are never leased).
+    with state.lock:
+        holders = [token for token, claimed in state.claimed_by_token.items() if claimed]
+        if holders:
+            token = rng.choice(holders)
+            claimed = state.claimed_by_token[token]
+            post_id = claimed.pop(rng.randrange(len(claimed)))
+        else:
+            token, post_id = rng.choice(state.admin_tokens), rng.choice(state.approved_ids)
+
+    def on_success(data):
+        if holders:
+            with state.lock:
+                state.approved_ids.append(post_id)
+
+    def on_failure():
+        # Still leased to this admin; try it again later
+        if holders:
+            with state.lock:
+                state.claimed_by_token[token].append(post_id)
+
+    return 'PUT', f'/api/admin/posts/{post_id}/status/', {'status': 'APPROVED'}, token, on_success, on_failure
+
+
+def admin_claim(state, rng):
+    token = rng.choice(state.admin_tokens)
+
+    def on_success(data):
+        with state.lock:
+            state.claimed_by_token[token].extend(post['id'] for post in data['posts'])
+
+    return 'POST', '/api/admin/posts/pending/claim/?n=10', None, token, on_success, None
+
+
+ROUTES = {
+    'public_list': public_list,
+    'public_detail': public_detail,
+    'public_batch': public_batch,
+    'author_create': author_create,
+    'author_update': author_update,
+    'login': login,
+    'admin_approve': admin_approve,
+    'admin_claim': admin_claim,
+}
+
+
+# --- Lock wait counters ---
+
+def lock_wait_snapshot():
+    """ InnoDB row-lock wait counters (MySQL), or None on backends without them. """
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW GLOBAL STATUS WHERE Variable_name IN ('Innodb_row_lock_waits', 'Innodb_row_lock_time')")
+            values = dict(cursor.fetchall())
+        return {'waits': int(values['Innodb_row_lock_waits']), 'time_ms': int(values['Innodb_row_lock_time'])}
+    return None
+
+
+def _lock_wait_delta(before, after):
+    if before is None or after is None:
+        return None
+    return {key: after[key] - before[key] for key in before}
+
+
+# --- Runner ---
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.conflicts = defaultdict(int)
+
+    def add(self, route, elapsed, status_code):
+        with self.lock:
+            self.samples[route].append(elapsed)
+            # A 409 is contention between clients (e.g. a moderation lease), not a failure
+            if status_code == 409:
+                self.conflicts[route] += 1
+            elif status_code >= 400:
+                self.errors[route] += 1
+
+
+def _plan(scenario, total, rng):
+    routes = list(scenario['mix'])
+    weights = [scenario['mix'][route] for route in routes]
+    return rng.choices(routes, weights=weights, k=total)
+
+
+def _handle_response(route, response, elapsed, recorder, on_success, on_failure):
+    recorder.add(route, elapsed, response.status_code)
+    if response.status_code < 400:
+        if on_success:
+            on_success(response.json())
+    elif on_failure:
+        on_failure()
+
+
+def _execute_sync(client, state, route, rng, recorder):
+    method, path, body, token, on_success, on_failure = ROUTES[route](state, rng)
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    started = time.perf_counter()
+    response = getattr(client, method.lower())(path, body, content_type='application/json', headers=headers) \
+        if body is not None else getattr(client, method.lower())(path, headers=headers)
+    elapsed = time.perf_counter() - started
+    _handle_response(route, response, elapsed, recorder, on_success, on_failure)
+
+
+async def _execute_async(client, state, route, rng, recorder):
+    method, path, body, token, on_success, on_failure = ROUTES[route](state, rng)
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    started = time.perf_counter()
+    request = getattr(client, method.lower())
+    response = await (request(path, body, content_type='application/json', headers=headers)
+                      if body is not None else request(path, headers=headers))
+    elapsed = time.perf_counter() - started
+    _handle_response(route, response, elapsed, recorder, on_success, on_failure)
+
+
+def run_wsgi(scenario, state, plan, concurrency, rng_seed, recorder):
+    position = iter(enumerate(plan))
+    position_lock = threading.Lock()
+
+    def worker(worker_id):
+        rng = random.Random(rng_seed + worker_id)
+        client = Client(raise_request_exception=False)
+        try:
+            while True:
+                with position_lock:
+                    item = next(position, None)
+                if item is None:
+                    return
+                _execute_sync(client, state, item[1], rng, recorder)
+        finally:
+            close_old_connections()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+
+
+def run_asgi(scenario, state, plan, concurrency, rng_seed, recorder):
+    async def main():
+        queue = asyncio.Queue()
+        for route in plan:
+            queue.put_nowait(route)
+
+        async def worker(worker_id):
+            rng = random.Random(rng_seed + worker_id)
+            client = AsyncClient(raise_request_exception=False)
+            while not queue.empty():
+                await _execute_async(client, state, queue.get_nowait(), rng, recorder)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    asyncio.run(main())
+
+
+def _percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_scenario(scenario, concurrency=None, total_requests=None, handler='wsgi', rng_seed=0):
+    """ Seed the (test) database, replay the scenario's traffic mix and return the report dict. """
+    concurrency = concurrency or scenario['concurrency']
+    total_requests = total_requests or scenario['requests']
+    rng = random.Random(rng_seed)
+
+    state = seed_database(scenario['seed'], rng)
+    plan = _plan(scenario, total_requests, rng)
+    recorder = Recorder()
+
+    started_at = timezone.now()
+    locks_before = lock_wait_snapshot()
+    started = time.perf_counter()
+    if handler == 'asgi':
+        run_asgi(scenario, state, plan, concurrency, rng_seed, recorder)
+    else:
+        run_wsgi(scenario, state, plan, concurrency, rng_seed, recorder)
+    duration = time.perf_counter() - started
+    locks_after = lock_wait_snapshot()
+
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        samples.sort()
+        routes[route] = {
+            'requests': len(samples),
+            'errors': recorder.errors[route],
+            'error_rate': recorder.errors[route] / len(samples),
+            'conflicts': recorder.conflicts[route],
+            'p50_ms': _percentile(samples, 50) * 1000,
+            'p95_ms': _percentile(samples, 95) * 1000,
+            'p99_ms': _percentile(samples, 99) * 1000,
+        }
+
+    completed = sum(route['requests'] for route in routes.values())
+    return {
+        'scenario': {'name': scenario['name'], 'version': scenario['version'], 'sha256': scenario['sha256']},
+        'handler': handler,
+        'concurrency': concurrency,
+        'database': connection.vendor,
+        'django': django.get_version(),
+        'started_at': started_at.isoformat(),
+        'duration_s': duration,
+        'requests': completed,
+        'throughput_rps': completed / duration if duration else None,
+        'errors': sum(route['errors'] for route in routes.values()),
+        'conflicts': sum(route['conflicts'] for route in routes.values()),
+        'lock_waits': _lock_wait_delta(locks_before, locks_after),
+        'routes': routes,
+    }
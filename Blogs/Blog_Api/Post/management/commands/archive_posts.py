@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Post.archive import archivable_posts, archive_posts, restore_posts
+from Post.changes import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Move old APPROVED posts and long-REJECTED posts into the archive table in chunked "
+        "transactions. Run it on a schedule so the hot Post table stays a fixed size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.POST_ARCHIVE_APPROVED_AFTER_DAYS,
+            help="Archive APPROVED posts created more than this many days ago.",
+        )
+        parser.add_argument(
+            '--rejected-days', type=int, default=settings.POST_ARCHIVE_REJECTED_AFTER_DAYS,
+            help="Archive REJECTED posts not updated for this many days.",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.POST_ARCHIVE_CHUNK_SIZE,
+            help="Posts moved per transaction.",
+        )
+        parser.add_argument(
+            '--tombstone-days', type=int, default=settings.CHANGE_FEED_TOMBSTONE_DAYS,
+            help="Also drop change feed tombstones older than this many days.",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many posts would move.")
+        parser.add_argument(
+            '--restore', type=int, nargs='+', metavar='ID',
+            help="Move the given archived post ids back into the Post table instead.",
+        )
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            restored = restore_posts(options['restore'])
+            self.stdout.write(self.style.SUCCESS(f"Restored {len(restored)} post(s)"))
+            return
+
+        if options['dry_run']:
+            count = archivable_posts(options['older_than_days'], options['rejected_days']).count()
+            self.stdout.write(f"{count} post(s) would be archived")
+            return
+
+        moved = archive_posts(
+            options['older_than_days'],
+            options['rejected_days'],
+            options['chunk_size'],
+            progress=lambda total: self.stdout.write(f"Archived {total} post(s)..."),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} post(s)"))
+
+        pruned = prune_tombstones(options['tombstone_days'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} tombstone(s)"))
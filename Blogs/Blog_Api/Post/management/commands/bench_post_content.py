@@ -0,0 +1,86 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Post.compression import available_codecs, compress, decompress
+from Post.models import Post
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog performance database index query cache worker "
+    "request response latency throughput storage buffer pool compression table row column"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the storage vs read-latency trade-off of compressed post bodies: compression ratio and "
+        "per-body compress/decompress time for each available codec, on real posts or synthetic text."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sample', type=int, default=200, help="Number of bodies to measure.")
+        parser.add_argument('--synthetic', action='store_true', help="Use generated text instead of stored posts.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timing repetitions per body.")
+
+    def handle(self, *args, **options):
+        bodies = [] if options['synthetic'] else self.stored_bodies(options['sample'])
+        source = "stored posts"
+        if not bodies:
+            bodies, source = self.synthetic_bodies(options['sample']), "synthetic text"
+
+        raw_sizes = [len(body.encode('utf-8')) for body in bodies]
+        threshold = settings.POST_CONTENT_COMPRESSION_THRESHOLD
+        eligible = sum(1 for size in raw_sizes if size > threshold)
+        self.stdout.write(
+            f"{len(bodies)} bodies from {source}, {sum(raw_sizes) / 1024:.1f} KiB raw, "
+            f"median {statistics.median(raw_sizes)} B; {eligible} above the {threshold} B threshold"
+        )
+        self.stdout.write(
+            f"\n{'codec':<8}{'ratio':>8}{'stored KiB':>12}{'compress us':>14}{'decompress us':>16}{'read MB/s':>12}"
+        )
+
+        for codec in available_codecs():
+            stored, compress_times, decompress_times = 0, [], []
+            for body, raw_size in zip(bodies, raw_sizes):
+                if raw_size <= threshold:
+                    stored += raw_size
+                    continue
+                compress_times.append(self.best_time(lambda: compress(body, codec), options['repeat']))
+                blob = compress(body, codec)
+                decompress_times.append(self.best_time(lambda: decompress(blob), options['repeat']))
+                stored += min(len(blob), raw_size)
+
+            ratio = sum(raw_sizes) / stored if stored else 1
+            if decompress_times:
+                compressed_bytes = sum(size for size in raw_sizes if size > threshold)
+                throughput = compressed_bytes / sum(decompress_times) / 1e6
+                self.stdout.write(
+                    f"{codec:<8}{ratio:>7.2f}x{stored / 1024:>12.1f}"
+                    f"{statistics.median(compress_times) * 1e6:>14.1f}"
+                    f"{statistics.median(decompress_times) * 1e6:>16.1f}{throughput:>12.1f}"
+                )
+            else:
+                self.stdout.write(f"{codec:<8}{'1.00x':>8}{stored / 1024:>12.1f}{'-':>14}{'-':>16}{'-':>12}")
+
+    def best_time(self, func, repeat):
+        best = None
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def stored_bodies(self, sample):
+        # .body decompresses rows that are already stored compressed
+        return [post.body for post in Post.objects.order_by('-id')[:sample]]
+
+    def synthetic_bodies(self, sample):
+        rng = random.Random(0)
+        return [
+            ' '.join(rng.choice(WORDS) for _ in range(rng.choice((50, 300, 1000, 3000))))
+            for _ in range(sample)
+        ]
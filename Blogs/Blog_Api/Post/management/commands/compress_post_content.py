@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Length
+
+from Post.models import Post, ArchivedPost
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert existing post bodies to the compressed storage format in chunked transactions "
+        "(or back, with --decompress). Safe to interrupt and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows rewritten per transaction.")
+        parser.add_argument('--decompress', action='store_true', help="Store every body as plain text again.")
+
+    def handle(self, *args, **options):
+        for model in (Post, ArchivedPost):
+            converted = self.convert(model, options['chunk_size'], unpack=options['decompress'])
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}: rewrote {converted} row(s)"))
+
+    def convert(self, model, chunk_size, unpack):
+        if unpack:
+            candidates = model.objects.filter(content_compressed__isnull=False)
+        else:
+            # A body over the byte threshold has at least threshold / 4 characters
+            candidates = model.objects.annotate(content_length=Length('content')).filter(
+                content_compressed__isnull=True,
+                content_length__gt=settings.POST_CONTENT_COMPRESSION_THRESHOLD // 4,
+            )
+
+        converted, last_id = 0, None
+        while True:
+            with transaction.atomic():
+                chunk = candidates.order_by('id').only('id', 'content', 'content_compressed')
+                if last_id is not None:
+                    chunk = chunk.filter(id__gt=last_id)
+                rows = list(chunk.select_for_update()[:chunk_size])
+                if not rows:
+                    return converted
+
+                changed = []
+                for row in rows:
+                    if unpack:
+                        row.body = row.body
+                        changed.append(row)
+                    else:
+                        row.pack_content()
+                        if row.content_compressed is not None:
+                            changed.append(row)
+                model.objects.bulk_update(changed, ['content', 'content_compressed'])
+
+            converted += len(changed)
+            last_id = rows[-1].id
+            self.stdout.write(f"  {model.__name__}: {converted} row(s) rewritten, up to id {last_id}")
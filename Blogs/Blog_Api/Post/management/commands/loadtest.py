@@ -0,0 +1,98 @@
+import json
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from Post import counters
+from Post.loadtest import load_scenario, run_scenario
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a versioned traffic mix (Post/loadtest_scenarios/) through the real URLconf "
+        "in-process against a freshly seeded test database, and report throughput, per-route "
+        "latency percentiles, error rates, 409 conflicts and DB lock waits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', default='mixed', help="Scenario name or path to a scenario JSON file.")
+        parser.add_argument('--concurrency', type=int, help="Concurrent clients (defaults to the scenario's).")
+        parser.add_argument('--requests', type=int, help="Total requests (defaults to the scenario's).")
+        parser.add_argument('--handler', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for data and traffic.")
+        parser.add_argument('--output', help="Write the JSON report to this file.")
+        parser.add_argument('--compare', help="Previous JSON report to diff against.")
+
+    def handle(self, *args, **options):
+        try:
+            scenario = load_scenario(options['scenario'])
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Could not load scenario: {exc}")
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh)
+
+        verbosity = options['verbosity']
+        setup_test_environment()
+        old_config = setup_databases(verbosity=verbosity, interactive=False)
+        try:
+            # The background view-count flusher would outlive the test database and write the
+            # run's views to real rows with the same ids, so don't start it; flush here instead
+            with mock.patch.object(counters, '_ensure_flusher'):
+                try:
+                    report = run_scenario(
+                        scenario, options['concurrency'], options['requests'], options['handler'], options['seed'],
+                    )
+                finally:
+                    counters.flush_views()
+        finally:
+            teardown_databases(old_config, verbosity=verbosity)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+
+        self.print_report(report, baseline)
+
+    def print_report(self, report, baseline):
+        scenario = report['scenario']
+        self.stdout.write(
+            f"Scenario {scenario['name']} v{scenario['version']} ({scenario['sha256'][:12]}), "
+            f"{report['handler']}, concurrency {report['concurrency']}, {report['database']}"
+        )
+        self.stdout.write(
+            f"{report['requests']} requests in {report['duration_s']:.2f}s = "
+            f"{report['throughput_rps']:.1f} req/s, {report['errors']} error(s), {report['conflicts']} conflict(s)"
+        )
+        self.stdout.write(f"DB lock waits: {report['lock_waits'] if report['lock_waits'] is not None else 'n/a'}")
+
+        if baseline and baseline['scenario'] != scenario:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline ran scenario {baseline['scenario']['name']} v{baseline['scenario']['version']}; "
+                "results are not comparable"
+            ))
+            baseline = None
+
+        self.stdout.write(
+            f"\n{'route':<16}{'reqs':>7}{'err%':>8}{'409s':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            + (f"{'p95 vs base':>14}" if baseline else "")
+        )
+        for route, stats in report['routes'].items():
+            line = (
+                f"{route:<16}{stats['requests']:>7}{stats['error_rate'] * 100:>7.1f}%{stats['conflicts']:>6}"
+                f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+            )
+            previous = baseline and baseline['routes'].get(route)
+            if previous:
+                line += f"{(stats['p95_ms'] / previous['p95_ms'] - 1) * 100:>+13.1f}%"
+            self.stdout.write(line)
+
+        if baseline:
+            change = (report['throughput_rps'] / baseline['throughput_rps'] - 1) * 100
+            self.stdout.write(f"\nThroughput vs baseline: {change:+.1f}%")
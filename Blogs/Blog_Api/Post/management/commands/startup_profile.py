@@ -0,0 +1,96 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter, since this process has already loaded everything
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+
+from django.conf import settings
+settings.INSTALLED_APPS
+settings_loaded = time.perf_counter()
+
+import django
+django.setup()
+apps_ready = time.perf_counter()
+
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls_loaded = time.perf_counter()
+
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss_kb //= 1024
+except ImportError:
+    rss_kb = None
+
+print(json.dumps({
+    'settings_ms': (settings_loaded - start) * 1000,
+    'apps_ms': (apps_ready - settings_loaded) * 1000,
+    'urlconf_ms': (urls_loaded - apps_ready) * 1000,
+    'rss_kb': rss_kb,
+}))
+"""
+
+PHASES = ('interpreter_ms', 'settings_ms', 'apps_ms', 'urlconf_ms', 'total_ms')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold start in a fresh process: settings load, app registry population and "
+        "URLconf import, plus peak RSS. Track the numbers from release to release."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help="Number of fresh processes to time.")
+        parser.add_argument('--json', action='store_true', help="Print machine-readable results.")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        runs = [self._run_probe(env) for _ in range(max(1, options['repeat']))]
+
+        summary = {
+            phase: {
+                'median': statistics.median(run[phase] for run in runs),
+                'min': min(run[phase] for run in runs),
+            }
+            for phase in PHASES
+        }
+        rss = [run['rss_kb'] for run in runs if run['rss_kb'] is not None]
+        summary['rss_kb'] = max(rss) if rss else None
+
+        if options['json']:
+            self.stdout.write(json.dumps({'runs': len(runs), 'phases': summary}, indent=2))
+            return
+
+        self.stdout.write(f"Startup profile over {len(runs)} fresh process(es):")
+        for phase in PHASES:
+            self.stdout.write(
+                f"  {phase[:-3]:<12} median {summary[phase]['median']:8.1f} ms   min {summary[phase]['min']:8.1f} ms"
+            )
+        if summary['rss_kb'] is not None:
+            self.stdout.write(f"  {'peak RSS':<12} {summary['rss_kb'] / 1024:8.1f} MiB")
+
+    def _run_probe(self, env):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if result.returncode != 0:
+            raise CommandError(f"Startup probe failed:\n{result.stderr}")
+
+        run = json.loads(result.stdout.strip().splitlines()[-1])
+        run['total_ms'] = elapsed_ms
+        run['interpreter_ms'] = elapsed_ms - run['settings_ms'] - run['apps_ms'] - run['urlconf_ms']
+        return run
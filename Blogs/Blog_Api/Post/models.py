@@ -1,8 +1,75 @@
 # posts/models.py
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from User.models import User # Import the custom User model
+from .compression import compress, decompress
 
-class Post(models.Model):
+
+class CompressedContentModel(models.Model):
+    """
+    Stores the post body compressed once it is larger than POST_CONTENT_COMPRESSION_THRESHOLD bytes.
+    Short bodies stay in the ``content`` text column; long ones go to ``content_compressed``
+    (``content`` is then empty) and are only decompressed when ``body`` is read. Read and write
+    the body through ``body``. Compression happens in save(); bulk operations should call
+    pack_content() themselves.
+    """
+    content = models.TextField()
+    content_compressed = models.BinaryField(null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def body(self):
+        blob = self.content_compressed
+        # A compressed row has an empty content column; text put there since is newer
+        if blob is None or self.content:
+            return self.content
+        # Cache per blob, so refresh_from_db() or a new blob invalidates it
+        cached = self.__dict__.get('_body_cache')
+        if cached is None or cached[0] is not blob:
+            cached = (blob, decompress(blob))
+            self.__dict__['_body_cache'] = cached
+        return cached[1]
+
+    @body.setter
+    def body(self, value):
+        self.content = value
+        self.content_compressed = None
+
+    def pack_content(self):
+        """ Move a long plain-text body into the compressed column (no-op for short or already packed bodies). """
+        if self.content:
+            # Plain text wins over an older blob
+            self.content_compressed = None
+        if self.content_compressed is not None:
+            return
+        raw_size = len(self.content.encode('utf-8'))
+        if raw_size <= settings.POST_CONTENT_COMPRESSION_THRESHOLD:
+            return
+        blob = compress(self.content)
+        # Incompressible bodies stay as text
+        if len(blob) < raw_size:
+            self.content_compressed = blob
+            self.content = ''
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            # The body lives in two columns; saving either means saving both
+            if update_fields & {'body', 'content', 'content_compressed'}:
+                update_fields.discard('body')
+                update_fields |= {'content', 'content_compressed'}
+                kwargs['update_fields'] = update_fields
+        if update_fields is None or 'content' in update_fields:
+            self.pack_content()
+        super().save(*args, **kwargs)
+
+
+class Post(CompressedContentModel):
     STATUS_CHOICES = (
         ('PENDING', 'Pending'),
         ('APPROVED', 'Approved'),
@@ -10,14 +77,81 @@ class Post(models.Model):
     )
 
     title = models.CharField(max_length=255)
-    content = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Updated in batches by Post.counters, never on the request path
+    view_count = models.PositiveIntegerField(default=0)
+    # Moderation lease, see Post.moderation
+    claimed_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_posts'
+    )
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+    # Set when brought back from the archive; archiving counts from here again (see Post.archive)
+    restored_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-view_count'], name='post_status_views_idx'),
+            models.Index(fields=['status', 'created_at'], name='post_status_created_idx'),
+            models.Index(fields=['status', 'updated_at'], name='post_status_updated_idx'),
+            # Public feed filters, see Post.feed
+            models.Index(fields=['status', 'title'], name='post_status_title_idx'),
+            models.Index(fields=['status', 'author', 'created_at'], name='post_status_author_created_idx'),
+            models.Index(fields=['status', 'author', 'updated_at'], name='post_status_author_updated_idx'),
+            models.Index(fields=['status', 'author', 'title'], name='post_status_author_title_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedPost(CompressedContentModel):
+    """ Cold storage for old APPROVED and long-REJECTED posts, moved out of Post by Post.archive. """
+    # Keeps the original Post id so links and restores stay stable
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_posts')
+    status = models.CharField(max_length=10, choices=Post.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    view_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.title
+
+
+class PostTombstone(models.Model):
+    """ Deletion log for the public change feed: one row per post that left the public feed. """
+    REASON_CHOICES = (
+        ('DELETED', 'Deleted'),
+        ('REJECTED', 'Rejected'),
+    )
+
+    # Plain id, not a ForeignKey: the post is usually gone
+    post_id = models.BigIntegerField()
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    removed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['removed_at', 'id'], name='tombstone_removed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} {self.reason}"
+
 
-    # class Meta:
-    #     ordering = ['-created_at']
+class PostEvent(models.Model):
+    """ Event log shared by every worker; Post.events.DatabaseBroker polls it for the SSE stream. """
+    # Doubles as the SSE event id, so ids are ordered across workers
+    id = models.BigAutoField(primary_key=True)
+    type = models.CharField(max_length=50)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f"{self.id} {self.type}"
@@ -0,0 +1,71 @@
+# posts/moderation.py
+"""
+Moderation queue leases.
+
+Each admin claims a batch of PENDING posts for MODERATION_CLAIM_LEASE, so
+moderators working at the same time don't pick up the same posts. On
+backends with SKIP LOCKED (MySQL 8+, PostgreSQL) concurrent claims skip
+each other's rows instead of waiting on them. SQLite has no row locks: there
+the guarded UPDATE below still prevents a post being claimed twice, but a
+claim that loses a race just comes back with fewer posts.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Post
+
+
+def claimable_posts(now):
+    """ PENDING posts with no lease, or whose lease has run out. """
+    return Post.objects.filter(status='PENDING').filter(
+        Q(claim_expires_at__isnull=True) | Q(claim_expires_at__lte=now)
+    )
+
+
+def claim_pending_posts(user, count):
+    """ Lease up to ``count`` of the oldest claimable posts to ``user``. Returns (posts, lease expiry). """
+    now = timezone.now()
+    expires_at = now + settings.MODERATION_CLAIM_LEASE
+
+    with transaction.atomic():
+        candidates = claimable_posts(now).order_by('created_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('id', flat=True)[:count])
+
+        # The UPDATE re-checks the claimable condition, so a post taken in the
+        # meantime (possible on SQLite) is left with whoever got it first
+        claimable_posts(now).filter(id__in=ids).update(claimed_by=user, claim_expires_at=expires_at)
+
+    posts = (
+        Post.objects.filter(id__in=ids, claimed_by=user, claim_expires_at=expires_at)
+        .select_related('author')
+        .order_by('created_at', 'id')
+    )
+    return posts, expires_at
+
+
+def release_claim(post_id, user):
+    """ Give a leased post back to the queue in one UPDATE. Returns True if ``user`` held the lease. """
+    return bool(
+        Post.objects.filter(id=post_id, claimed_by=user)
+        .update(claimed_by=None, claim_expires_at=None)
+    )
+
+
+def decide_post(post_id, user, new_status, previous_statuses=None):
+    """
+    Set a post's status and clear its lease in one UPDATE.
+    Refused (returns False) while another admin holds a live lease on it, or,
+    when ``previous_statuses`` is given, if the post is not currently in one of them.
+    """
+    now = timezone.now()
+    posts = Post.objects.filter(id=post_id)
+    if previous_statuses is not None:
+        posts = posts.filter(status__in=previous_statuses)
+    return bool(
+        posts.filter(Q(claimed_by__isnull=True) | Q(claimed_by=user) | Q(claim_expires_at__lte=now))
+        .update(status=new_status, updated_at=now, claimed_by=None, claim_expires_at=None)
+    )
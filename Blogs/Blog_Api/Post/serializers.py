@@ -1,14 +1,16 @@
 # posts/serializers.py
 from rest_framework import serializers
-from .models import Post
+from .models import Post, ArchivedPost
 
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.SerializerMethodField()
+    # The body may be stored compressed (see CompressedContentModel); always go through .body
+    content = serializers.CharField(source='body')
 
     class Meta:
         model = Post
-        fields = ('id', 'title', 'content', 'author', 'status', 'created_at', 'updated_at')
-        read_only_fields = ('id', 'author', 'status', 'created_at', 'updated_at')
+        fields = ('id', 'title', 'content', 'author', 'status', 'view_count', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'author', 'status', 'view_count', 'created_at', 'updated_at')
 
     def get_author(self, obj):
         # Return the author's name
@@ -20,10 +22,22 @@ class PostSerializer(serializers.ModelSerializer):
 
 class PublicPostSerializer(serializers.ModelSerializer):
     author = serializers.SerializerMethodField()
+    content = serializers.CharField(source='body', read_only=True)
 
     class Meta:
         model = Post
-        fields = ('id', 'title', 'content', 'author', 'created_at')
+        fields = ('id', 'title', 'content', 'author', 'view_count', 'created_at')
+        read_only_fields = ('view_count',)
         
     def get_author(self, obj):
-        return obj.author.name
\ No newline at end of file
+        return obj.author.name
+
+class PublicArchivedPostSerializer(PublicPostSerializer):
+    # Same public shape, read from the archive table
+    class Meta(PublicPostSerializer.Meta):
+        model = ArchivedPost
+
+class ChangeFeedPostSerializer(PublicPostSerializer):
+    # Clients keep updated_at to tell which copy of a post is newer
+    class Meta(PublicPostSerializer.Meta):
+        fields = PublicPostSerializer.Meta.fields + ('updated_at',)
@@ -1,3 +1,809 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from User.models import User
+from . import counters, loadtest, moderation
+from .archive import archive_posts, restore_posts
+from .changes import encode_cursor, get_changes
+from .compression import decompress
+from .events import DatabaseBroker, InMemoryBroker
+from . import feed
+from .feed import feed_plan, public_feed
+from .models import ArchivedPost, Post, PostEvent, PostTombstone
+
+
+class InMemoryBrokerTests(SimpleTestCase):
+
+    async def test_fan_out_to_every_subscriber(self):
+        broker = InMemoryBroker(replay_size=10, queue_size=10)
+        first, second = broker.subscribe(), broker.subscribe()
+
+        broker.publish('post.approved', {'id': 1})
+
+        for subscription in (first, second):
+            event = await asyncio.wait_for(subscription.get(), timeout=1)
+            self.assertEqual((event.id, event.type, event.data), (1, 'post.approved', {'id': 1}))
+
+    async def test_publish_from_another_thread(self):
+        broker = InMemoryBroker(replay_size=10, queue_size=10)
+        subscription = broker.subscribe()
+
+        await asyncio.to_thread(broker.publish, 'post.approved', {'id': 7})
+
+        event = await asyncio.wait_for(subscription.get(), timeout=1)
+        self.assertEqual(event.data, {'id': 7})
+
+    async def test_resume_replays_missed_events(self):
+        broker = InMemoryBroker(replay_size=10, queue_size=10)
+        for post_id in range(1, 4):
+            broker.publish('post.approved', {'id': post_id})
+
+        subscription = broker.subscribe(last_event_id=1)
+
+        replayed = [await asyncio.wait_for(subscription.get(), timeout=1) for _ in range(2)]
+        self.assertEqual([event.id for event in replayed], [2, 3])
+
+    async def test_resume_past_replay_buffer_asks_for_resync(self):
+        broker = InMemoryBroker(replay_size=2, queue_size=10)
+        for post_id in range(1, 6):
+            broker.publish('post.approved', {'id': post_id})
+
+        subscription = broker.subscribe(last_event_id=1)
+
+        event = await asyncio.wait_for(subscription.get(), timeout=1)
+        self.assertEqual((event.id, event.type), (5, 'resync'))
+
+    async def test_slow_subscriber_is_dropped(self):
+        broker = InMemoryBroker(replay_size=10, queue_size=2)
+        subscription = broker.subscribe()
+
+        for post_id in range(1, 4):
+            broker.publish('post.approved', {'id': post_id})
+        await asyncio.sleep(0)
+
+        self.assertTrue(subscription.closed)
+        self.assertEqual(broker.subscriber_count, 0)
+
+
+class DatabaseBrokerTests(TransactionTestCase):
+    """ The poller reads from its own thread, so the events must really be committed. """
+
+    def broker(self, **options):
+        return DatabaseBroker(**{'poll_interval': 0.01, 'settle_seconds': 0, 'queue_size': 10, **options})
+
+    async def next_event(self, subscription):
+        return await asyncio.wait_for(subscription.get(), timeout=2)
+
+    async def test_events_reach_subscribers_of_other_workers(self):
+        # Two brokers stand in for two worker processes
+        publisher, listener = self.broker(), self.broker()
+        subscription = await listener.asubscribe()
+
+        published = await sync_to_async(publisher.publish)('post.approved', {'id': 1})
+
+        event = await self.next_event(subscription)
+        self.assertEqual((event.id, event.type, event.data), (published.id, 'post.approved', {'id': 1}))
+        subscription.close()
+        self.assertEqual(listener.subscriber_count, 0)
+
+    async def test_resume_replays_missed_events_then_live_ones(self):
+        broker = self.broker()
+        published = [await sync_to_async(broker.publish)('post.approved', {'id': i}) for i in range(3)]
+
+        subscription = await broker.asubscribe(last_event_id=published[0].id)
+        live = await sync_to_async(broker.publish)('post.approved', {'id': 3})
+
+        received = [(await self.next_event(subscription)).id for _ in range(3)]
+        self.assertEqual(received, [published[1].id, published[2].id, live.id])
+        subscription.close()
+
+    async def test_resume_past_retention_asks_for_resync(self):
+        broker = self.broker()
+        published = [await sync_to_async(broker.publish)('post.approved', {'id': i}) for i in range(3)]
+        await PostEvent.objects.filter(id__lte=published[1].id).adelete()
+
+        subscription = await broker.asubscribe(last_event_id=published[0].id)
+
+        event = await self.next_event(subscription)
+        self.assertEqual((event.id, event.type), (published[2].id, 'resync'))
+        subscription.close()
+
+    async def test_unsettled_event_holds_back_later_ones(self):
+        broker = self.broker(settle_seconds=60)
+        subscription = await broker.asubscribe()
+        # An event committed late, after a higher id was already visible
+        await PostEvent.objects.acreate(type='post.approved', data={'id': 1})
+        await PostEvent.objects.acreate(
+            type='post.approved', data={'id': 2}, created_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(subscription.get(), timeout=0.1)
+        subscription.close()
+
+    def test_prune_drops_expired_events(self):
+        broker = self.broker(retention=timedelta(hours=1))
+        PostEvent.objects.create(type='post.approved', data={}, created_at=timezone.now() - timedelta(hours=2))
+        kept = broker.publish('post.approved', {})
+
+        self.assertEqual(broker.prune(), 1)
+        self.assertEqual(list(PostEvent.objects.values_list('id', flat=True)), [kept.id])
+
+
+
+class PostStreamTests(SimpleTestCase):
+
+    def test_stream_is_refused_under_wsgi(self):
+        response = self.client.get(reverse('public-post-stream'))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.streaming)
+
+    async def test_stream_under_asgi(self):
+        broker = InMemoryBroker(replay_size=10, queue_size=10)
+
+        with mock.patch('Post.views.get_broker', return_value=broker):
+            response = await AsyncClient().get(reverse('public-post-stream'))
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'text/event-stream'))
+
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+        broker.publish('post.approved', {'id': 1})
+        self.assertIn(b'event: post.approved', await asyncio.wait_for(anext(chunks), timeout=1))
+
+        # A client disconnect cancels the task waiting on the stream
+        waiting = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(broker.subscriber_count, 0)
+
+class PublicFeedQueryPlanTests(TestCase):
+    """ Every supported filter/ordering combination must be served by its index. """
+
+    PLANS = [
+        ({}, 'post_status_created_idx'),
+        ({'ordering': 'created_at'}, 'post_status_created_idx'),
+        ({'ordering': '-updated_at'}, 'post_status_updated_idx'),
+        ({'created_after': '2024-01-01'}, 'post_status_created_idx'),
+        ({'created_after': '2024-01-01', 'created_before': '2030-01-01', 'ordering': 'created_at'}, 'post_status_created_idx'),
+        ({'updated_before': '2030-01-01T00:00:00Z'}, 'post_status_updated_idx'),
+        ({'title_prefix': 'Post 1'}, 'post_status_title_idx'),
+        ({'author': '1'}, 'post_status_author_created_idx'),
+        ({'author': '1', 'ordering': 'updated_at'}, 'post_status_author_updated_idx'),
+        ({'author': '1', 'created_after': '2024-01-01'}, 'post_status_author_created_idx'),
+        ({'author': '1', 'updated_after': '2024-01-01', 'ordering': '-updated_at'}, 'post_status_author_updated_idx'),
+        ({'author': '1', 'title_prefix': 'Post'}, 'post_status_author_title_idx'),
+    ]
+
+    REJECTED = [
+        {'ordering': 'title'},
+        {'ordering': 'view_count'},
+        {'created_after': '2024-01-01', 'ordering': 'updated_at'},
+        {'title_prefix': 'Post', 'ordering': '-created_at'},
+        {'created_after': '2024-01-01', 'updated_after': '2024-01-01'},
+        {'created_after': 'last week'},
+        {'created_after': '2024-13-45'},
+        {'updated_before': '2024-02-30T25:00:00Z'},
+        {'author': 'me'},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [
+            User.objects.create_user(email=f'feed{i}@example.com', password='pw', name=f'Feed {i}')
+            for i in range(3)
+        ]
+        Post.objects.bulk_create([
+            Post(title=f'Post {i}', content='Body', author=authors[i % 3], status=('APPROVED', 'PENDING', 'REJECTED')[i % 3])
+            for i in range(60)
+        ])
+
+    def test_supported_combinations_use_their_index(self):
+        for params, index in self.PLANS:
+            with self.subTest(params=params):
+                self.assertEqual(feed_plan(params)[2], index)
+                self.assertIn(index, public_feed(params).explain())
+
+    def test_unsupported_combinations_are_rejected(self):
+        for params in self.REJECTED:
+            with self.subTest(params=params):
+                with self.assertRaises(ValidationError):
+                    feed_plan(params)
+
+    def test_title_prefix_filter(self):
+        titles = set(public_feed({'title_prefix': 'Post 1'}).values_list('title', flat=True))
+        self.assertEqual(titles, {'Post 12', 'Post 15', 'Post 18'})
+
+    def test_title_prefix_ending_in_z(self):
+        author = User.objects.get(email='feed0@example.com')
+        Post.objects.bulk_create([
+            Post(title=title, content='Body', author=author, status='APPROVED')
+            for title in ('Jazz', 'Jazzy', 'Jaz', 'Jb', 'Ja{')
+        ])
+
+        titles = list(public_feed({'title_prefix': 'Jaz'}).values_list('title', flat=True))
+
+        self.assertEqual(titles, ['Jaz', 'Jazz', 'Jazzy'])
+
+    def test_prefix_upper_bound(self):
+        self.assertEqual(feed._prefix_upper_bound('Jaz'), 'Ja{')
+        self.assertEqual(feed._prefix_upper_bound('ab\U0010ffff\U0010ffff'), 'ac')
+        self.assertEqual(feed._prefix_upper_bound('a\ud7ff'), 'a\ue000')
+        self.assertIsNone(feed._prefix_upper_bound('\U0010ffff'))
+
+        with self.assertRaises(ValidationError):
+            feed_plan({'title_prefix': '\U0010ffff'})
+
+    def test_title_prefix_on_mysql_uses_like(self):
+        with mock.patch.object(feed, 'connection', mock.Mock(vendor='mysql')):
+            filters, _, index = feed_plan({'title_prefix': 'Jaz'})
+
+        # Plain LIKE in the column's collation, not LIKE BINARY
+        self.assertEqual(filters, {'title__istartswith': 'Jaz'})
+        self.assertEqual(index, 'post_status_title_idx')
+
+
+@mock.patch.object(counters, '_ensure_flusher')
+class ViewCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(email='counter@example.com', password='pw', name='Counter')
+        cls.posts = Post.objects.bulk_create([
+            Post(title=f'Counted {i}', content='Body', author=author, status='APPROVED') for i in range(3)
+        ])
+
+    def setUp(self):
+        counters._pending.clear()
+        self.addCleanup(counters._pending.clear)
+
+    def view_counts(self):
+        return dict(Post.objects.order_by('id').values_list('id', 'view_count'))
+
+    def test_views_are_buffered_until_flushed(self, ensure_flusher):
+        first, second, _ = self.posts
+        with self.assertNumQueries(0):
+            for post in (first, first, second):
+                counters.record_view(post.id)
+
+        self.assertEqual(counters._pending, Counter({first.id: 2, second.id: 1}))
+        self.assertEqual(set(self.view_counts().values()), {0})
+
+    def test_flush_writes_one_update_per_increment(self, ensure_flusher):
+        first, second, third = self.posts
+        Post.objects.filter(id=first.id).update(view_count=5)
+        for post in (first, first, second, second, third):
+            counters.record_view(post.id)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(counters.flush_views(), 5)
+
+        self.assertEqual(self.view_counts(), {first.id: 7, second.id: 2, third.id: 1})
+        self.assertFalse(counters._pending)
+        self.assertEqual(counters.flush_views(), 0)
+
+    def test_failed_flush_requeues_unwritten_views(self, ensure_flusher):
+        first, second, _ = self.posts
+        for post in (first, second, second):
+            counters.record_view(post.id)
+
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError('gone away')):
+            with self.assertRaises(DatabaseError):
+                counters.flush_views()
+
+        self.assertEqual(counters._pending, Counter({first.id: 1, second.id: 2}))
+        counters.flush_views()
+        self.assertEqual(self.view_counts()[second.id], 2)
+
+    @override_settings(VIEW_COUNT_MAX_PENDING=2)
+    def test_full_buffer_flush_failure_does_not_raise(self, ensure_flusher):
+        first, second, _ = self.posts
+        counters.record_view(first.id)
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError('gone away')), \
+                self.assertLogs('Post.counters', 'ERROR'):
+            counters.record_view(second.id)
+
+        self.assertEqual(counters._pending, Counter({first.id: 1, second.id: 1}))
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(email='archive@example.com', password='pw', name='Archive')
+        long_ago = timezone.now() - timedelta(days=1000)
+        self.old = Post.objects.bulk_create([
+            Post(title=f'Old {i}', content='Old body', author=self.author, status='APPROVED') for i in range(5)
+        ])
+        Post.objects.filter(id__in=[post.id for post in self.old]).update(created_at=long_ago, view_count=3)
+        self.recent = Post.objects.create(title='Recent', content='New body', author=self.author, status='APPROVED')
+        self.created_at = long_ago
+
+    def test_archive_moves_due_posts_in_chunks(self):
+        progress = []
+        moved = archive_posts(approved_after_days=730, rejected_after_days=30, chunk_size=2, progress=progress.append)
+
+        self.assertEqual(moved, 5)
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(list(Post.objects.values_list('id', flat=True)), [self.recent.id])
+        self.assertEqual(
+            sorted(ArchivedPost.objects.values_list('id', flat=True)), [post.id for post in self.old]
+        )
+        self.assertEqual(archive_posts(730, 30, chunk_size=2), 0)
+
+    def test_detail_view_falls_back_to_archive(self):
+        archive_posts(730, 30)
+
+        response = self.client.get(reverse('public-post-detail', kwargs={'id': self.old[0].id}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['title'], response.data['content']), ('Old 0', 'Old body'))
+
+    def test_detail_view_hides_archived_rejected_posts(self):
+        ArchivedPost.objects.create(
+            id=10_000, title='Gone', content='x', author=self.author, status='REJECTED',
+            created_at=self.created_at, updated_at=self.created_at,
+        )
+
+        response = self.client.get(reverse('public-post-detail', kwargs={'id': 10_000}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_batch_includes_archived_posts(self):
+        archive_posts(730, 30)
+        ids = [self.recent.id, self.old[1].id, 99_999]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('public-post-batch'), {'ids': ','.join(map(str, ids))})
+
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [(item['id'], item.get('title')) for item in response.data['results']],
+            [(self.recent.id, 'Recent'), (self.old[1].id, 'Old 1'), (99_999, None)],
+        )
+        self.assertTrue(response.data['results'][2]['missing'])
+
+    def test_restore_keeps_original_row(self):
+        archive_posts(730, 30)
+        target = self.old[0]
+
+        restored = restore_posts([target.id, 99_999])
+
+        self.assertEqual([post.id for post in restored], [target.id])
+        post = Post.objects.get(id=target.id)
+        self.assertEqual((post.title, post.body, post.view_count), ('Old 0', 'Old body', 3))
+        self.assertEqual(post.created_at, self.created_at)
+        self.assertFalse(ArchivedPost.objects.filter(id=target.id).exists())
+
+    def test_restored_post_is_not_archived_again_straight_away(self):
+        archive_posts(730, 30)
+        target = self.old[0]
+        restore_posts([target.id])
+
+        self.assertEqual(archive_posts(730, 30), 0)
+        self.assertTrue(Post.objects.filter(id=target.id).exists())
+
+        # Due again a full period after the restore
+        Post.objects.filter(id=target.id).update(restored_at=timezone.now() - timedelta(days=731))
+        self.assertEqual(archive_posts(730, 30), 1)
+
+
+class ModerationLeaseTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(email='queue@example.com', password='pw', name='Queue')
+        cls.first_admin = User.objects.create_user(email='mod1@example.com', password='pw', name='Mod 1', role='ADMIN')
+        cls.second_admin = User.objects.create_user(email='mod2@example.com', password='pw', name='Mod 2', role='ADMIN')
+        cls.posts = Post.objects.bulk_create([
+            Post(title=f'Pending {i}', content='Body', author=author, status='PENDING') for i in range(5)
+        ])
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def claimed_ids(self, user):
+        return set(Post.objects.filter(claimed_by=user).values_list('id', flat=True))
+
+    def test_concurrent_claims_get_disjoint_posts(self):
+        first, _ = moderation.claim_pending_posts(self.first_admin, 3)
+        second, _ = moderation.claim_pending_posts(self.second_admin, 3)
+
+        self.assertEqual([post.id for post in first], [post.id for post in self.posts[:3]])
+        self.assertEqual([post.id for post in second], [post.id for post in self.posts[3:]])
+        self.assertFalse(self.claimed_ids(self.first_admin) & self.claimed_ids(self.second_admin))
+
+    def test_claim_that_loses_a_race_keeps_the_winner(self):
+        moderation.claim_pending_posts(self.first_admin, 2)
+        # A stale read that still sees the first admin's posts as free
+        stale = [Post.objects.filter(status='PENDING'), moderation.claimable_posts(timezone.now())]
+        with mock.patch.object(moderation, 'claimable_posts', side_effect=lambda now: stale.pop(0)):
+            posts, _ = moderation.claim_pending_posts(self.second_admin, 4)
+
+        self.assertEqual([post.id for post in posts], [post.id for post in self.posts[2:4]])
+        self.assertEqual(self.claimed_ids(self.first_admin), {post.id for post in self.posts[:2]})
+
+    def test_expired_lease_can_be_reclaimed(self):
+        moderation.claim_pending_posts(self.first_admin, 5)
+        self.assertFalse(moderation.claim_pending_posts(self.second_admin, 5)[0])
+
+        Post.objects.update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+        posts, expires_at = moderation.claim_pending_posts(self.second_admin, 2)
+
+        self.assertEqual([post.id for post in posts], [post.id for post in self.posts[:2]])
+        self.assertGreater(expires_at, timezone.now())
+
+    def test_only_the_holder_can_release(self):
+        post = self.posts[0]
+        moderation.claim_pending_posts(self.first_admin, 1)
+        url = reverse('admin-post-release', kwargs={'id': post.id})
+
+        self.assertEqual(self.client_for(self.second_admin).post(url).status_code, 404)
+        self.assertEqual(self.claimed_ids(self.first_admin), {post.id})
+
+        self.assertEqual(self.client_for(self.first_admin).post(url).status_code, 200)
+        post.refresh_from_db()
+        self.assertEqual((post.claimed_by, post.claim_expires_at), (None, None))
+
+    def test_decision_on_a_post_leased_to_someone_else_conflicts(self):
+        post = self.posts[0]
+        moderation.claim_pending_posts(self.first_admin, 1)
+        url = reverse('admin-post-status-update', kwargs={'id': post.id})
+
+        response = self.client_for(self.second_admin).put(url, {'status': 'REJECTED'}, format='json')
+        self.assertEqual(response.status_code, 409)
+
+        Post.objects.filter(id=post.id).update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.client_for(self.second_admin).put(url, {'status': 'REJECTED'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        post.refresh_from_db()
+        self.assertEqual((post.status, post.claimed_by), ('REJECTED', None))
+
+    def test_decide_is_a_single_update(self):
+        post = self.posts[0]
+        moderation.claim_pending_posts(self.first_admin, 1)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(moderation.decide_post(post.id, self.first_admin, 'REJECTED'))
+        with self.assertNumQueries(1):
+            self.assertFalse(moderation.release_claim(post.id, self.first_admin))
+
+        response = self.client_for(self.first_admin).put(
+            reverse('admin-post-status-update', kwargs={'id': 99_999}), {'status': 'APPROVED'}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_only_the_first_approval_is_announced(self):
+        post = self.posts[0]
+        url = reverse('admin-post-status-update', kwargs={'id': post.id})
+
+        with mock.patch('Post.views.publish_post_approved') as publish:
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client_for(self.first_admin).put(url, {'status': 'APPROVED'}, format='json')
+                self.assertEqual(response.status_code, 200)
+
+        publish.assert_called_once_with(post.id)
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=5, CHANGE_FEED_TOMBSTONE_DAYS=90)
+class ChangeFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(email='changes@example.com', password='pw', name='Changes')
+        cls.admin = User.objects.create_user(email='changes-admin@example.com', password='pw', name='Admin', role='ADMIN')
+        cls.posts = Post.objects.bulk_create([
+            Post(title=f'Changed {i}', content='Body', author=author, status='APPROVED') for i in range(3)
+        ])
+        cls.pending = Post.objects.create(title='Not yet', content='Body', author=author, status='PENDING')
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        for offset, post in enumerate(cls.posts):
+            Post.objects.filter(id=post.id).update(updated_at=an_hour_ago + timedelta(seconds=offset))
+
+    def later(self, seconds):
+        # Move the feed's clock forward past the settle window
+        return mock.patch('Post.changes.timezone.now', return_value=timezone.now() + timedelta(seconds=seconds))
+
+    def reject(self, post):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse('admin-post-status-update', kwargs={'id': post.id})
+        self.assertEqual(client.put(url, {'status': 'REJECTED'}, format='json').status_code, 200)
+
+    def test_pages_follow_the_keyset_cursor(self):
+        first = get_changes(limit=2)
+        second = get_changes(first['cursor'], limit=2)
+        third = get_changes(second['cursor'], limit=2)
+
+        self.assertEqual([post.id for post in first['posts']], [post.id for post in self.posts[:2]])
+        self.assertTrue(first['has_more'])
+        self.assertEqual([post.id for post in second['posts']], [self.posts[2].id])
+        self.assertFalse(second['has_more'])
+        self.assertEqual((third['posts'], third['tombstones']), ([], []))
+
+    def test_recent_changes_wait_for_the_settle_window(self):
+        cursor = get_changes()['cursor']
+        Post.objects.filter(id=self.posts[0].id).update(title='Edited', updated_at=timezone.now())
+
+        self.assertEqual(get_changes(cursor)['posts'], [])
+        with self.later(10):
+            self.assertEqual([post.title for post in get_changes(cursor)['posts']], ['Edited'])
+
+    def test_only_posts_that_were_public_are_tombstoned(self):
+        self.assertEqual(get_changes()['tombstones'], [])
+        cursor = get_changes()['cursor']
+
+        self.reject(self.posts[1])
+        self.reject(self.pending)
+
+        with self.later(10):
+            tombstones = get_changes(cursor)['tombstones']
+        self.assertEqual([(row.post_id, row.reason) for row in tombstones], [(self.posts[1].id, 'REJECTED')])
+        self.assertEqual(PostTombstone.objects.count(), 1)
+
+    def test_fresh_sync_gets_no_tombstones(self):
+        self.reject(self.posts[0])
+
+        with self.later(10):
+            changes = get_changes()
+        self.assertEqual(changes['tombstones'], [])
+        self.assertEqual([post.id for post in changes['posts']], [post.id for post in self.posts[1:]])
+
+    def test_streams_stay_on_the_same_page(self):
+        comeback = self.posts[2]
+        for post in self.posts:
+            self.reject(post)
+        # Rejected at T + 0..2 seconds, the last one approved again at T + 3
+        start = timezone.now() - timedelta(minutes=10)
+        cursor = encode_cursor({'posts': (start, 0), 'tombstones': (start, 0)})
+        for offset, tombstone in enumerate(PostTombstone.objects.order_by('id')):
+            PostTombstone.objects.filter(id=tombstone.id).update(removed_at=start + timedelta(seconds=offset))
+        Post.objects.filter(id=comeback.id).update(status='APPROVED', updated_at=start + timedelta(seconds=3))
+
+        first = get_changes(cursor, limit=2)
+        second = get_changes(first['cursor'], limit=2)
+
+        # The full tombstone page ends at T + 1, so the post approved at T + 3 waits
+        self.assertEqual([row.post_id for row in first['tombstones']], [post.id for post in self.posts[:2]])
+        self.assertEqual(first['posts'], [])
+        self.assertTrue(first['has_more'])
+        self.assertEqual([row.post_id for row in second['tombstones']], [comeback.id])
+        self.assertEqual([post.id for post in second['posts']], [comeback.id])
+        self.assertFalse(second['has_more'])
+
+    def test_malformed_cursor_is_a_bad_request(self):
+        naive = encode_cursor({'posts': (datetime(2030, 1, 1), 0), 'tombstones': (datetime(2030, 1, 1), 0)})
+
+        for since in ('garbage', naive):
+            with self.subTest(since=since):
+                response = self.client.get(reverse('public-post-changes'), {'since': since})
+                self.assertEqual(response.status_code, 400)
+
+    def test_cursor_past_tombstone_retention_is_gone(self):
+        long_ago = timezone.now() - timedelta(days=91)
+        cursor = encode_cursor({'posts': (long_ago, 0), 'tombstones': (long_ago, 0)})
+
+        response = self.client.get(reverse('public-post-changes'), {'since': cursor})
+
+        self.assertEqual(response.status_code, 410)
+
+
+@override_settings(POST_CONTENT_COMPRESSION_THRESHOLD=100, POST_CONTENT_CODEC='zlib')
+class CompressedContentTests(TestCase):
+    LONG = 'A long and very repetitive body. ' * 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(email='compressed@example.com', password='pw', name='Compressed')
+
+    def stored(self, model, pk):
+        text, blob = model.objects.filter(pk=pk).values_list('content', 'content_compressed').get()
+        return text, blob if blob is None else bytes(blob)
+
+    def test_long_body_round_trips_compressed(self):
+        post = Post.objects.create(title='Long', content=self.LONG, author=self.author)
+
+        text, blob = self.stored(Post, post.pk)
+        self.assertEqual(text, '')
+        self.assertLess(len(blob), len(self.LONG))
+        self.assertEqual(decompress(blob), self.LONG)
+        self.assertEqual(Post.objects.get(pk=post.pk).body, self.LONG)
+
+    def test_short_body_stays_plain_text(self):
+        post = Post.objects.create(title='Short', content='Short body', author=self.author)
+
+        self.assertEqual(self.stored(Post, post.pk), ('Short body', None))
+
+    def test_update_fields_content_rewrites_both_columns(self):
+        post = Post.objects.create(title='Grows', content='Short body', author=self.author)
+
+        post.body = self.LONG
+        post.save(update_fields=['body'])
+        text, blob = self.stored(Post, post.pk)
+        self.assertEqual((text, decompress(blob)), ('', self.LONG))
+
+        post.content = 'Short again'
+        post.save(update_fields=['content'])
+        self.assertEqual(self.stored(Post, post.pk), ('Short again', None))
+
+    def test_text_assigned_to_content_replaces_a_compressed_body(self):
+        post = Post.objects.create(title='Replaced', content=self.LONG, author=self.author)
+
+        post.content = 'Plain replacement'
+        self.assertEqual(post.body, 'Plain replacement')
+        post.save()
+
+        self.assertEqual(self.stored(Post, post.pk), ('Plain replacement', None))
+
+    def test_api_reads_and_writes_the_body(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+
+        body = self.LONG.strip()  # DRF trims surrounding whitespace
+        response = client.post(reverse('author-post-create'), {'title': 'Via API', 'content': body}, format='json')
+        post_id = response.data['post']['id']
+        self.assertEqual(self.stored(Post, post_id)[0], '')
+
+        url = reverse('author-post-detail-edit-delete', kwargs={'id': post_id})
+        self.assertEqual(client.get(url).data['content'], body)
+        client.put(url, {'title': 'Via API', 'content': 'Shorter'}, format='json')
+        self.assertEqual(client.get(url).data['content'], 'Shorter')
+
+    def test_reads_bodies_stored_as_plain_text(self):
+        post = Post.objects.create(title='Legacy', content='x', author=self.author)
+        # As written before compression existed, however long
+        Post.objects.filter(pk=post.pk).update(content=self.LONG, content_compressed=None)
+
+        self.assertEqual(Post.objects.get(pk=post.pk).body, self.LONG)
+
+    def test_archive_and_restore_keep_the_stored_form(self):
+        post = Post.objects.create(title='Old', content=self.LONG, author=self.author, status='APPROVED')
+        Post.objects.filter(pk=post.pk).update(created_at=timezone.now() - timedelta(days=1000))
+        stored = self.stored(Post, post.pk)
+
+        archive_posts(730, 30)
+        self.assertEqual(self.stored(ArchivedPost, post.pk), stored)
+        self.assertEqual(ArchivedPost.objects.get(pk=post.pk).body, self.LONG)
+
+        restore_posts([post.pk])
+        self.assertEqual(self.stored(Post, post.pk), stored)
+
+
+class PublicPostBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(email='batch@example.com', password='pw', name='Batch')
+        cls.approved = Post.objects.bulk_create([
+            Post(title=f'Batch {i}', content='Body', author=author, status='APPROVED') for i in range(3)
+        ])
+        cls.pending = Post.objects.create(title='Hidden', content='Body', author=author, status='PENDING')
+        cls.url = reverse('public-post-batch')
+
+    def test_results_follow_request_order_and_collapse_duplicates(self):
+        first, second, third = (post.id for post in self.approved)
+        ids = [third, first, third, self.pending.id, first, second]
+
+        with self.assertNumQueries(2):  # posts, then the archive for the one left over
+            response = self.client.get(self.url, {'ids': ','.join(map(str, ids))})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([item['id'] for item in response.data['results']], [third, first, self.pending.id, second])
+        self.assertEqual(response.data['results'][2], {'id': self.pending.id, 'missing': True})
+
+    def test_all_found_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': ','.join(str(post.id) for post in self.approved)})
+
+        self.assertEqual(response.data['count'], 3)
+
+    def test_post_accepts_an_object_or_a_bare_list(self):
+        ids = [post.id for post in self.approved[:2]]
+
+        for body in ({'ids': ids}, ids):
+            with self.subTest(body=body):
+                response = self.client.post(self.url, body, content_type='application/json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([item['id'] for item in response.data['results']], ids)
+
+    def test_bad_requests(self):
+        cases = [
+            ('get', {'ids': ''}),
+            ('get', {'ids': '1,two'}),
+            ('post', 5),
+            ('post', {'ids': 5}),
+            ('post', {'ids': [{'id': 1}]}),
+        ]
+        for method, data in cases:
+            with self.subTest(method=method, data=data):
+                if method == 'get':
+                    response = self.client.get(self.url, data)
+                else:
+                    response = self.client.post(self.url, data, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+    @override_settings(PUBLIC_POST_BATCH_MAX=3)
+    def test_batch_size_is_capped(self):
+        response = self.client.get(self.url, {'ids': '1,2,3,4'})
+        self.assertEqual(response.status_code, 400)
+
+        # Duplicates don't count towards the cap
+        response = self.client.get(self.url, {'ids': '1,2,3,3,3'})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoadTestTests(TransactionTestCase):
+    """ The runners use their own threads (and connections), so the seeded rows must be committed. """
+
+    SCENARIO = {
+        'name': 'tiny',
+        'version': 1,
+        'sha256': '0' * 64,
+        'concurrency': 2,
+        'requests': 40,
+        'seed': {'authors': 3, 'admins': 2, 'posts_per_author': 4, 'approved_ratio': 0.5},
+        'mix': dict.fromkeys(loadtest.ROUTES, 1),
+    }
+
+    def run_scenario(self, handler, concurrency=None):
+        # Don't leave a view-count flusher thread behind; flush before the tables are emptied
+        with mock.patch.object(counters, '_ensure_flusher'):
+            try:
+                return loadtest.run_scenario(self.SCENARIO, concurrency, handler=handler)
+            finally:
+                counters.flush_views()
+
+    def assert_clean_report(self, report, handler):
+        self.assertEqual((report['handler'], report['requests']), (handler, 40))
+        self.assertEqual(report['scenario'], {'name': 'tiny', 'version': 1, 'sha256': '0' * 64})
+        self.assertEqual(report['errors'], 0, report['routes'])
+        self.assertEqual(sum(route['requests'] for route in report['routes'].values()), 40)
+        for stats in report['routes'].values():
+            self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+            self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+
+    def test_wsgi_run(self):
+        # SQLite fails overlapping write transactions ("database is locked") instead of waiting
+        concurrency = 1 if connection.vendor == 'sqlite' else None
+        self.assert_clean_report(self.run_scenario('wsgi', concurrency), 'wsgi')
+
+    def test_asgi_run(self):
+        self.assert_clean_report(self.run_scenario('asgi'), 'asgi')
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(
+            [loadtest._percentile(values, pct) for pct in (0, 50, 95, 99, 100)], [1, 50, 95, 99, 100]
+        )
+        self.assertEqual(loadtest._percentile([7], 99), 7)
+        self.assertIsNone(loadtest._percentile([], 50))
+
+    def test_load_scenario(self):
+        scenario = loadtest.load_scenario('mixed')
+        self.assertEqual(scenario['name'], 'mixed')
+        self.assertEqual(len(scenario['sha256']), 64)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as fh:
+            json.dump({**self.SCENARIO, 'mix': {'public_list': 1, 'delete_everything': 1}}, fh)
+            fh.flush()
+            with self.assertRaisesMessage(ValueError, 'delete_everything'):
+                loadtest.load_scenario(fh.name)
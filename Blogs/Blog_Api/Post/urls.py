@@ -1,14 +1,20 @@
 # posts/urls.py
 from django.urls import path
 from .views import (
-    PublicPostListView, PublicPostDetailView,
+    PublicPostListView, PublicPostDetailView, PublicMostViewedPostListView, PublicPostBatchView,
+    PublicPostChangesView, public_post_stream,
     AuthorPostListCreateView, AuthorPostRetrieveUpdateDestroyView,
-    AdminPendingPostListView, AdminPostStatusUpdateView, AdminPostDeleteView
+    AdminPendingPostListView, AdminPostStatusUpdateView, AdminPostDeleteView,
+    AdminArchivedPostRestoreView, AdminPendingPostClaimView, AdminPostReleaseView
 )
 
 urlpatterns = [
     # Public APIs (5.4)
     path('public/posts/', PublicPostListView.as_view(), name='public-post-list'),
+    path('public/posts/most-viewed/', PublicMostViewedPostListView.as_view(), name='public-post-most-viewed'),
+    path('public/posts/batch/', PublicPostBatchView.as_view(), name='public-post-batch'),
+    path('public/posts/changes/', PublicPostChangesView.as_view(), name='public-post-changes'),
+    path('public/posts/stream/', public_post_stream, name='public-post-stream'),
     path('public/posts/<int:id>/', PublicPostDetailView.as_view(), name='public-post-detail'),
     
     # Author APIs (5.3)
@@ -18,6 +24,9 @@ urlpatterns = [
 
     # Admin APIs (5.2)
     path('admin/posts/pending/', AdminPendingPostListView.as_view(), name='admin-pending-posts'),
+    path('admin/posts/pending/claim/', AdminPendingPostClaimView.as_view(), name='admin-pending-posts-claim'),
+    path('admin/posts/<int:id>/release/', AdminPostReleaseView.as_view(), name='admin-post-release'),
     path('admin/posts/<int:id>/status/', AdminPostStatusUpdateView.as_view(), name='admin-post-status-update'),
     path('admin/posts/<int:id>/', AdminPostDeleteView.as_view(), name='admin-post-delete'),
+    path('admin/posts/archive/<int:id>/restore/', AdminArchivedPostRestoreView.as_view(), name='admin-archived-post-restore'),
 ]
\ No newline at end of file
@@ -1,42 +1,209 @@
 # posts/views.py
+import asyncio
+
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from django.conf import settings
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from django.views.decorators.http import require_GET
 
-from .models import Post
-from .serializers import PostSerializer, PublicPostSerializer
+from .models import Post, ArchivedPost
+from .archive import restore_posts
+from .changes import CursorExpired, InvalidCursor, get_changes, record_tombstones
+from .events import format_sse, get_broker, publish_post_approved
+from .feed import public_feed
+from .counters import record_view
+from .moderation import claim_pending_posts, release_claim, decide_post
+from .serializers import (
+    PostSerializer, PublicPostSerializer, PublicArchivedPostSerializer, ChangeFeedPostSerializer
+)
 from User.permissions import IsAdminUser, IsAuthor, IsAuthorOrAdmin
 
 # --- Public APIs (No JWT Needed) ---
 
 class PublicPostListView(generics.ListAPIView):
-    """ GET /api/public/posts/ - Returns only APPROVED posts. """
+    """
+    GET /api/public/posts/ - Returns only APPROVED posts.
+    Optional filters: author, created_after/before, updated_after/before, title_prefix, ordering (see Post/feed.py).
+    """
     serializer_class = PublicPostSerializer
     permission_classes = [] # Publicly accessible
 
     def get_queryset(self):
-        # return Post.objects.filter(status='APPROVED')
-        return Post.objects.all()
+        return public_feed(self.request.query_params)
 
 class PublicPostDetailView(generics.RetrieveAPIView):
     """ GET /api/public/posts/{postId}/ - Fetch single APPROVED post. """
     serializer_class = PublicPostSerializer
     permission_classes = [] # Publicly accessible
     lookup_field = 'id'
-    
+
+    def get_queryset(self):
+        return Post.objects.select_related('author')
+
     def get_object(self):
-        # Fetch the object, ensuring it is APPROVED
-        queryset = self.get_queryset()
-        obj = get_object_or_404(queryset, id=self.kwargs.get(self.lookup_field))
-        
-        if obj.status != 'APPROVED':
-            # Optionally raise a 404/403 for posts that exist but aren't approved
-            # For simplicity matching public visibility, 404 is common for non-existent
-            raise status.HTTP_404_NOT_FOUND
-            
-        return obj
+        # Only APPROVED posts are visible; anything else is a plain 404
+        queryset = self.get_queryset().filter(status='APPROVED')
+        return get_object_or_404(queryset, id=self.kwargs.get(self.lookup_field))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            instance = self.get_object()
+        except Http404:
+            # Old posts live in the archive table; serve them from there transparently
+            archived = get_object_or_404(
+                ArchivedPost.objects.select_related('author').filter(status='APPROVED'),
+                id=self.kwargs.get(self.lookup_field),
+            )
+            return Response(PublicArchivedPostSerializer(archived).data)
+
+        # Buffered in memory and flushed in batches, so this GET stays read-only
+        record_view(instance.id)
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+class PublicMostViewedPostListView(generics.ListAPIView):
+    """ GET /api/public/posts/most-viewed/?limit=10 - APPROVED posts ordered by view count. """
+    serializer_class = PublicPostSerializer
+    permission_classes = [] # Publicly accessible
+
+    def get_queryset(self):
+        try:
+            limit = int(self.request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, settings.MOST_VIEWED_POSTS_MAX))
+        return (
+            Post.objects.filter(status='APPROVED')
+            .select_related('author')
+            .order_by('-view_count', '-id')[:limit]
+        )
+
+class PublicPostBatchView(APIView):
+    """
+    GET /api/public/posts/batch/?ids=1,2,3 or POST {"ids": [1, 2, 3]} (or [1, 2, 3]) - Fetch several APPROVED posts at once.
+    Results follow the requested order; ids that are missing or not approved come back as {"id": ..., "missing": true}.
+    """
+    permission_classes = [] # Publicly accessible
+
+    def get(self, request, format=None):
+        return self.fetch(request.query_params.get('ids', ''))
+
+    def post(self, request, format=None):
+        # {"ids": [...]} or a bare JSON list; anything else is rejected by fetch()
+        data = request.data
+        if isinstance(data, list):
+            return self.fetch(data)
+        return self.fetch(data.get('ids', '') if hasattr(data, 'get') else None)
+
+    def fetch(self, raw_ids):
+        if isinstance(raw_ids, str):
+            raw_ids = [part for part in raw_ids.split(',') if part.strip()]
+        try:
+            ids = [int(value) for value in raw_ids]
+        except (TypeError, ValueError):
+            return Response({"detail": "ids must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Keep the first occurrence of each id, in request order
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return Response({"detail": "ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.PUBLIC_POST_BATCH_MAX:
+            return Response(
+                {"detail": f"At most {settings.PUBLIC_POST_BATCH_MAX} ids per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # One query for the whole batch, authors joined in
+        posts = {
+            post_id: PublicPostSerializer(post).data
+            for post_id, post in Post.objects.filter(status='APPROVED').select_related('author').in_bulk(ids).items()
+        }
+        # Old posts live in the archive table, as in PublicPostDetailView; one more query for the rest
+        unresolved = [post_id for post_id in ids if post_id not in posts]
+        if unresolved:
+            archived = ArchivedPost.objects.filter(status='APPROVED').select_related('author').in_bulk(unresolved)
+            posts.update(
+                (post_id, PublicArchivedPostSerializer(post).data) for post_id, post in archived.items()
+            )
+
+        results = [posts.get(post_id, {"id": post_id, "missing": True}) for post_id in ids]
+        return Response({"count": len(posts), "results": results})
+
+class PublicPostChangesView(APIView):
+    """
+    GET /api/public/posts/changes/?since=<cursor> - Posts approved or edited, and posts removed, since the cursor.
+    Omit ``since`` for a full sync; keep requesting with the returned cursor while hasMore is true.
+    """
+    permission_classes = [] # Publicly accessible
+
+    def get(self, request, format=None):
+        try:
+            changes = get_changes(request.query_params.get('since') or None)
+        except InvalidCursor as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except CursorExpired as exc:
+            # Client must start over with a full sync
+            return Response({"detail": str(exc)}, status=status.HTTP_410_GONE)
+
+        return Response({
+            "posts": ChangeFeedPostSerializer(changes['posts'], many=True).data,
+            "deleted": [
+                {"id": tombstone.post_id, "reason": tombstone.reason, "removedAt": tombstone.removed_at}
+                for tombstone in changes['tombstones']
+            ],
+            "cursor": changes['cursor'],
+            "hasMore": changes['has_more']
+        })
+
+@require_GET
+async def public_post_stream(request):
+    """
+    GET /api/public/posts/stream/ - Server-Sent Events: one 'post.approved' event per newly approved post.
+    Async view, serve it over ASGI (Blog_Api/asgi.py); idle connections only cost a queue each.
+    Honours Last-Event-ID for resume and sends a comment line every SSE_HEARTBEAT_SECONDS.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would be buffered in full and hold the worker until it is killed
+        return JsonResponse(
+            {"detail": "The event stream is only available when the API is served over ASGI"},
+            status=503
+        )
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('lastEventId')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    subscription = await get_broker().asubscribe(last_event_id)
+
+    async def event_stream():
+        try:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    break
+                yield format_sse(event)
+        finally:
+            # Client went away (or fell too far behind)
+            subscription.close()
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx buffering the stream
+    return response
 
 # --- AUTHOR APIs (Requires JWT) ---
 class AuthorPostListCreateView(generics.ListCreateAPIView):
@@ -85,7 +252,10 @@ class AuthorPostRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView)
         return Response(response_data)
         
     def perform_destroy(self, instance):
-        instance.delete()
+        with transaction.atomic():
+            if instance.status == 'APPROVED':
+                record_tombstones([instance.id], 'DELETED')
+            instance.delete()
         return Response({"message": "Your post has been deleted"}, status=status.HTTP_204_NO_CONTENT)
 
 # --- ADMIN APIs (Requires JWT + Admin Role) ---
@@ -107,19 +277,71 @@ class AdminPostStatusUpdateView(generics.UpdateAPIView):
     lookup_field = 'id'
 
     def update(self, request, *args, **kwargs):
-        instance = self.get_object()
         new_status = request.data.get('status')
         
         if new_status not in ['APPROVED', 'REJECTED']:
             return Response({"detail": "Status must be 'APPROVED' or 'REJECTED'"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        instance.status = new_status
-        instance.save(update_fields=['status', 'updated_at'])
+
+        post_id = self.kwargs.get(self.lookup_field)
+        with transaction.atomic():
+            # Each decide_post is a single UPDATE that also clears any moderation lease
+            if new_status == 'APPROVED':
+                # Only a post that wasn't public yet is announced; re-approving is a silent no-op
+                decided = decide_post(post_id, request.user, new_status, previous_statuses=['PENDING', 'REJECTED'])
+                if decided:
+                    transaction.on_commit(lambda: publish_post_approved(post_id))
+                else:
+                    decided = decide_post(post_id, request.user, new_status, previous_statuses=['APPROVED'])
+            else:
+                # Only a post that was public needs a tombstone; try the usual never-public case first
+                decided = decide_post(post_id, request.user, new_status, previous_statuses=['PENDING', 'REJECTED'])
+                if not decided and decide_post(post_id, request.user, new_status, previous_statuses=['APPROVED']):
+                    decided = True
+                    # Drop it from change feed clients
+                    record_tombstones([post_id], 'REJECTED')
+
+        if not decided:
+            if not Post.objects.filter(id=post_id).exists():
+                return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+            return Response({"detail": "Post is claimed by another admin"}, status=status.HTTP_409_CONFLICT)
         
         return Response({
             "message": "Post status updated",
-            "postId": instance.id,
-            "status": instance.status
+            "postId": post_id,
+            "status": new_status
+        }, status=status.HTTP_200_OK)
+
+class AdminPendingPostClaimView(APIView):
+    """ POST /api/admin/posts/pending/claim/?n=50 - Lease a batch of pending posts to the calling admin. """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, format=None):
+        try:
+            count = int(request.query_params.get('n', settings.MODERATION_CLAIM_DEFAULT))
+        except ValueError:
+            return Response({"detail": "n must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        count = max(1, min(count, settings.MODERATION_CLAIM_MAX))
+
+        posts, expires_at = claim_pending_posts(request.user, count)
+        data = PostSerializer(posts, many=True).data
+
+        return Response({
+            "count": len(data),
+            "expiresAt": expires_at,
+            "posts": data
+        }, status=status.HTTP_200_OK)
+
+class AdminPostReleaseView(APIView):
+    """ POST /api/admin/posts/{postId}/release/ - Hand a claimed post back to the queue. """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, id, format=None):
+        if not release_claim(id, request.user):
+            return Response({"detail": "You do not hold a claim on this post"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "message": "Claim released",
+            "postId": id
         }, status=status.HTTP_200_OK)
 
 class AdminPostDeleteView(generics.DestroyAPIView):
@@ -129,7 +351,24 @@ class AdminPostDeleteView(generics.DestroyAPIView):
     lookup_field = 'id'
     
     def perform_destroy(self, instance):
-        instance.delete()
+        with transaction.atomic():
+            if instance.status == 'APPROVED':
+                record_tombstones([instance.id], 'DELETED')
+            instance.delete()
         return Response({"message": "Post deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
-    
 
+class AdminArchivedPostRestoreView(APIView):
+    """ POST /api/admin/posts/archive/{postId}/restore/ - Move an archived post back into the live table. """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, id, format=None):
+        restored = restore_posts([id])
+        if not restored:
+            return Response({"detail": "Archived post not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        post = restored[0]
+        return Response({
+            "message": "Post restored",
+            "postId": post.id,
+            "status": post.status
+        }, status=status.HTTP_200_OK)
@@ -35,6 +35,10 @@ class CustomJWTAuthentication(BaseAuthentication):
             user = User.objects.get(id=payload['user_id'])
         except User.DoesNotExist:
             raise AuthenticationFailed("User not found")
+
+        # Deactivated (or being purged) accounts lose access immediately
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive")
         
         return (user, None)
 
@@ -52,7 +56,7 @@ class EmailBackend(ModelBackend):
         except User.DoesNotExist:
             return None
         
-        if user.check_password(password):
+        if user.check_password(password) and self.user_can_authenticate(user):
             return user
         
         return None
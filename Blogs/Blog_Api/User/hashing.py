@@ -0,0 +1,42 @@
+# users/hashing.py
+"""
+Process-pool password hashing.
+
+Kept free of model imports: with the 'spawn' start method each worker
+imports this module before Django is set up.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Below this many passwords the pool's startup costs more than it saves
+PARALLEL_THRESHOLD = 8
+
+
+def _init_worker(settings_module):
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    import django
+    django.setup()
+
+
+def _hash(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
+
+
+def hash_passwords(passwords, workers=None):
+    """ make_password() for each password, spread over a process pool (one process per core by default). """
+    from django.conf import settings
+
+    if len(passwords) < PARALLEL_THRESHOLD or workers == 1:
+        return [_hash(password) for password in passwords]
+
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    # 'spawn' is safe to use from a threaded web worker, unlike fork
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(settings.SETTINGS_MODULE,),
+    ) as pool:
+        return list(pool.map(_hash, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
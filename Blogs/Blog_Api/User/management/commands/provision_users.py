@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from User.provisioning import parse_rows, provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users from a CSV (name,email,password[,role]) or NDJSON file. Emails are checked in one "
+        "query, passwords hashed across all cores, and users inserted with bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Defaults to the file extension.")
+        parser.add_argument('--workers', type=int, help="Hashing processes (defaults to the number of cores).")
+        parser.add_argument('--output', help="Write one JSON result per row to this file.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        try:
+            with open(path, encoding='utf-8-sig') as fh:
+                rows = parse_rows(fh.read(), fmt)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read {path}: {exc}")
+
+        results = provision_users(rows, options['workers'])
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                for result in results:
+                    fh.write(json.dumps(result) + '\n')
+
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+            if result['status'] == 'invalid':
+                self.stdout.write(f"  row {result['row']}: {'; '.join(result['errors'])}")
+        summary = ', '.join(f"{count} {status_name}" for status_name, count in sorted(counts.items()))
+        self.stdout.write(self.style.SUCCESS(f"{len(results)} row(s): {summary or 'nothing to do'}"))
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from User.models import User
+from User.purge import purge_user, remaining_posts, request_purge
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete users and their posts in small batches. With --user, deactivates and purges those "
+        "users; otherwise resumes every purge requested through the admin API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, nargs='+', metavar='ID', help="User ids to deactivate and purge.")
+        parser.add_argument('--batch-size', type=int, default=settings.USER_PURGE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['user']:
+            users = list(User.objects.filter(id__in=options['user']))
+            missing = set(options['user']) - {user.id for user in users}
+            if missing:
+                raise CommandError(f"No such user(s): {', '.join(map(str, sorted(missing)))}")
+            for user in users:
+                request_purge(user)
+        else:
+            users = list(User.objects.filter(purge_requested_at__isnull=False).order_by('purge_requested_at'))
+
+        if not users:
+            self.stdout.write("Nothing to purge")
+            return
+
+        for user in users:
+            total = remaining_posts(user.id)
+            self.stdout.write(f"Purging user {user.id} ({user.email}): {total} post(s)")
+            deleted = purge_user(
+                user.id,
+                options['batch_size'],
+                progress=lambda done: self.stdout.write(f"  {done}/{total} post(s) deleted"),
+            )
+            self.stdout.write(self.style.SUCCESS(f"Purged user {user.id} and {deleted} post(s)"))
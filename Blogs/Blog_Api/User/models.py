@@ -37,6 +37,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Set when an admin asks for the account to be removed; see User.purge
+    purge_requested_at = models.DateTimeField(null=True, blank=True)
 
     objects = CustomUserManager()
 
@@ -44,4 +46,17 @@ class User(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ['name']
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+
+class UserPurge(models.Model):
+    """
+    Left behind when a purge deletes a user, so "done" can be told apart from "never existed".
+    Holds no personal data: the point of the purge is that none is left.
+    """
+    user_id = models.IntegerField(unique=True)
+    purge_requested_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Purge of user {self.user_id}"
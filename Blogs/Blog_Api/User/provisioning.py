@@ -0,0 +1,121 @@
+# users/provisioning.py
+"""
+Bulk user provisioning from CSV or NDJSON.
+
+Each row has name, email, password and optionally role. Emails are checked
+against the DB, ignoring case, with one set-based query, passwords are hashed in parallel
+(User.hashing), and new users are inserted with bulk_create. Every input row
+gets a result: created, exists, duplicate or invalid.
+"""
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db.models.functions import Lower
+
+from .hashing import hash_passwords
+from .models import User
+
+ROLES = {role for role, _ in User.ROLE_CHOICES}
+NAME_MAX_LENGTH = User._meta.get_field('name').max_length
+EMAIL_MAX_LENGTH = User._meta.get_field('email').max_length
+
+
+def parse_rows(text, fmt):
+    """ Rows from CSV (with a header line) or NDJSON text. Unparseable NDJSON lines become None. """
+    if fmt == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+    if fmt == 'ndjson':
+        rows = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            rows.append(row if isinstance(row, dict) else None)
+        return rows
+    raise ValueError("format must be 'csv' or 'ndjson'")
+
+
+def _validate(row):
+    """ Returns (cleaned row, errors). """
+    if row is None:
+        return None, ["Row is not a JSON object"]
+
+    errors = []
+    name = str(row.get('name') or '').strip()
+    email = User.objects.normalize_email(str(row.get('email') or '').strip())
+    password = str(row.get('password') or '')
+    role = str(row.get('role') or 'AUTHOR').strip().upper()
+
+    if not name:
+        errors.append("name is required")
+    elif len(name) > NAME_MAX_LENGTH:
+        errors.append(f"name must be at most {NAME_MAX_LENGTH} characters")
+    if not password:
+        errors.append("password is required")
+    if role not in ROLES:
+        errors.append(f"role must be one of {', '.join(sorted(ROLES))}")
+    if len(email) > EMAIL_MAX_LENGTH:
+        errors.append(f"email must be at most {EMAIL_MAX_LENGTH} characters")
+    else:
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append("email is invalid")
+    return {'name': name, 'email': email, 'password': password, 'role': role}, errors
+
+
+def provision_users(rows, workers=None):
+    """ Create users for the given rows. Returns one result dict per row, in input order. """
+    results = [None] * len(rows)
+    candidates = []
+    seen = set()
+
+    for index, row in enumerate(rows):
+        cleaned, errors = _validate(row)
+        if errors:
+            results[index] = {"row": index + 1, "email": cleaned and cleaned['email'], "status": "invalid", "errors": errors}
+        elif cleaned['email'].lower() in seen:
+            results[index] = {"row": index + 1, "email": cleaned['email'], "status": "duplicate"}
+        else:
+            seen.add(cleaned['email'].lower())
+            candidates.append((index, cleaned))
+
+    # One query for every email already taken, in any letter case
+    existing = set(
+        User.objects.annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=[cleaned['email'].lower() for _, cleaned in candidates])
+        .values_list('email_lower', flat=True)
+    )
+    to_create = []
+    for index, cleaned in candidates:
+        if cleaned['email'].lower() in existing:
+            results[index] = {"row": index + 1, "email": cleaned['email'], "status": "exists"}
+        else:
+            to_create.append((index, cleaned))
+
+    hashes = hash_passwords([cleaned['password'] for _, cleaned in to_create], workers)
+    User.objects.bulk_create([
+        User(name=cleaned['name'], email=cleaned['email'], role=cleaned['role'], password=password_hash)
+        for (_, cleaned), password_hash in zip(to_create, hashes)
+    ], batch_size=500, ignore_conflicts=True)
+
+    # ignore_conflicts hides which rows lost a race with another insert. Each hash has its
+    # own salt, so a stored row is ours only if it holds the hash generated here
+    stored = {
+        email.lower(): (user_id, password_hash) for email, user_id, password_hash in
+        User.objects.filter(email__in=[cleaned['email'] for _, cleaned in to_create])
+        .values_list('email', 'id', 'password')
+    }
+    for (index, cleaned), password_hash in zip(to_create, hashes):
+        user_id, stored_hash = stored.get(cleaned['email'].lower(), (None, None))
+        if stored_hash == password_hash:
+            results[index] = {"row": index + 1, "email": cleaned['email'], "status": "created", "id": user_id}
+        else:
+            results[index] = {"row": index + 1, "email": cleaned['email'], "status": "exists"}
+    return results
@@ -0,0 +1,117 @@
+# users/purge.py
+"""
+Chunked user removal.
+
+Deleting a User directly would cascade to every one of their posts in a
+single transaction. Instead the account is deactivated at once, then posts
+are deleted in batches of USER_PURGE_BATCH_SIZE, each batch in its own short
+transaction. Every batch is committed on its own, so an interrupted purge
+just resumes where it stopped. Batches are read with SELECT ... FOR UPDATE,
+so a purge running twice (API thread and `manage.py purge_users`, say)
+never deletes or tombstones the same posts twice. Deleting the user leaves
+a UserPurge record behind.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from Post.changes import record_tombstones
+from Post.models import Post, ArchivedPost
+from .models import User, UserPurge
+
+logger = logging.getLogger(__name__)
+
+# Users with a background purge running in this process
+_running = set()
+_running_lock = threading.Lock()
+
+
+def request_purge(user):
+    """ Deactivate the account and mark it for purging. One UPDATE. """
+    now = timezone.now()
+    User.objects.filter(id=user.id).update(is_active=False, purge_requested_at=now)
+    user.is_active = False
+    user.purge_requested_at = now
+
+
+def remaining_posts(user_id):
+    return Post.objects.filter(author_id=user_id).count() + ArchivedPost.objects.filter(author_id=user_id).count()
+
+
+def _delete_in_batches(model, user_id, batch_size, progress, deleted):
+    while True:
+        with transaction.atomic():
+            posts = model.objects.filter(author_id=user_id).order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Rows another purge is on are skipped; it tombstones and deletes them
+                posts = posts.select_for_update(skip_locked=True)
+            else:
+                posts = posts.select_for_update()
+            batch = list(posts.values_list('id', 'status')[:batch_size])
+            if not batch:
+                return deleted
+            ids = [post_id for post_id, _ in batch]
+            # Approved posts were public: tell change feed clients they are gone
+            record_tombstones([post_id for post_id, post_status in batch if post_status == 'APPROVED'], 'DELETED')
+            model.objects.filter(id__in=ids).delete()
+
+        deleted += len(ids)
+        if progress:
+            progress(deleted)
+
+
+def purge_user(user_id, batch_size=None, progress=None):
+    """
+    Delete a user's posts (live and archived) in batches, then the user.
+    Safe to call again after an interruption. Returns the number of posts deleted.
+    """
+    batch_size = batch_size or settings.USER_PURGE_BATCH_SIZE
+    deleted = _delete_in_batches(Post, user_id, batch_size, progress, 0)
+    deleted = _delete_in_batches(ArchivedPost, user_id, batch_size, progress, deleted)
+
+    # Nothing large is left to cascade to
+    with transaction.atomic():
+        user = User.objects.select_for_update().filter(id=user_id).first()
+        if user is not None:
+            UserPurge.objects.create(
+                user_id=user.id, purge_requested_at=user.purge_requested_at, completed_at=timezone.now(),
+            )
+            user.delete()
+    return deleted
+
+
+def completed_purge(user_id):
+    """ The record of a finished purge of the user, or None. """
+    return UserPurge.objects.filter(user_id=user_id).first()
+
+
+def purge_is_running(user_id):
+    """ Whether this process has a background purge of the user in flight. """
+    return user_id in _running
+
+
+def purge_user_in_background(user_id):
+    """
+    Best-effort purge on a daemon thread; `manage.py purge_users` finishes anything it leaves behind.
+    Returns False, without starting another, if this process is already purging the user.
+    """
+    with _running_lock:
+        if user_id in _running:
+            return False
+        _running.add(user_id)
+
+    def run():
+        try:
+            purge_user(user_id)
+        except Exception:
+            logger.exception("Purge of user %s stopped; rerun manage.py purge_users to resume", user_id)
+        finally:
+            with _running_lock:
+                _running.discard(user_id)
+            close_old_connections()
+
+    threading.Thread(target=run, name=f'purge-user-{user_id}', daemon=True).start()
+    return True
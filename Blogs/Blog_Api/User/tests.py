@@ -1,3 +1,228 @@
-from django.test import TestCase
+import threading
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from Post.models import ArchivedPost, Post, PostTombstone
+from . import hashing, provisioning, purge
+from .models import User
+
+
+class Interrupted(Exception):
+    pass
+
+
+class UserPurgeTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='purge-admin@example.com', password='pw', name='Admin', role='ADMIN')
+        self.user = User.objects.create_user(email='leaving@example.com', password='pw', name='Leaving')
+        self.posts = Post.objects.bulk_create([
+            Post(title=f'Post {i}', content='Body', author=self.user, status=('APPROVED', 'PENDING')[i % 2])
+            for i in range(5)
+        ])
+        archived = self.posts[0]
+        ArchivedPost.objects.create(
+            id=10_000, title='Archived', content='Body', author=self.user, status='APPROVED',
+            created_at=archived.created_at, updated_at=archived.updated_at,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('admin-user-purge', kwargs={'pk': self.user.id})
+
+    def test_interrupted_purge_resumes_where_it_stopped(self):
+        def stop_after_first_batch(deleted):
+            raise Interrupted
+
+        with self.assertRaises(Interrupted):
+            purge.purge_user(self.user.id, batch_size=2, progress=stop_after_first_batch)
+
+        # The first batch is committed on its own
+        self.assertEqual(purge.remaining_posts(self.user.id), 4)
+        self.assertEqual(list(PostTombstone.objects.values_list('post_id', flat=True)), [self.posts[0].id])
+        self.assertTrue(User.objects.filter(id=self.user.id).exists())
+
+        self.assertEqual(purge.purge_user(self.user.id, batch_size=2), 4)
+
+        self.assertEqual(purge.remaining_posts(self.user.id), 0)
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+        self.assertIsNotNone(purge.completed_purge(self.user.id))
+        # Each approved post (live or archived) tombstoned exactly once
+        self.assertEqual(
+            sorted(PostTombstone.objects.values_list('post_id', flat=True)),
+            [self.posts[0].id, self.posts[2].id, self.posts[4].id, 10_000],
+        )
+
+    def test_second_request_does_not_start_another_purge(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        calls = []
+
+        def blocking_purge(user_id):
+            calls.append(user_id)
+            release.wait(5)
+
+        with mock.patch.object(purge, 'purge_user', side_effect=blocking_purge):
+            first = self.client.post(self.url)
+            second = self.client.post(self.url)
+            release.set()
+            for thread in threading.enumerate():
+                if thread.name == f'purge-user-{self.user.id}':
+                    thread.join(5)
+
+        self.assertEqual((first.status_code, second.status_code), (202, 202))
+        self.assertEqual(second.data['message'], 'Purge already in progress')
+        self.assertEqual(calls, [self.user.id])
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+    def test_progress_reports_done_once_the_user_is_gone(self):
+        purge.request_purge(self.user)
+        self.assertEqual(self.client.get(self.url).data['status'], 'inProgress')
+
+        purge.purge_user(self.user.id)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['status'], response.data['remainingPosts']), ('done', 0))
+        self.assertIsNotNone(response.data['purgeRequestedAt'])
+
+    def test_progress_of_an_unknown_user_is_not_found(self):
+        response = self.client.get(reverse('admin-user-purge', kwargs={'pk': 99_999}))
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisionUsersTests(TestCase):
+
+    def setUp(self):
+        self.existing = User.objects.create_user(email='taken@example.com', password='pw', name='Taken')
+
+    def test_every_row_gets_an_outcome(self):
+        rows = provisioning.parse_rows(
+            '{"name": "New", "email": "new@example.com", "password": "pw"}\n'
+            '{"name": "Again", "email": "NEW@example.com", "password": "pw"}\n'
+            '{"name": "Taken", "email": "taken@example.com", "password": "pw"}\n'
+            '{"name": "", "email": "not-an-email", "password": "pw", "role": "OWNER"}\n'
+            'not json\n',
+            'ndjson',
+        )
+
+        results = provisioning.provision_users(rows, workers=1)
+
+        self.assertEqual(
+            [result['status'] for result in results], ['created', 'duplicate', 'exists', 'invalid', 'invalid']
+        )
+        created = User.objects.get(email='new@example.com')
+        self.assertEqual(results[0]['id'], created.id)
+        self.assertTrue(created.check_password('pw'))
+        self.assertEqual(len(results[3]['errors']), 3)
+
+    def test_existing_email_matches_in_any_case(self):
+        results = provisioning.provision_users([{'name': 'T', 'email': 'Taken@Example.com', 'password': 'pw'}], workers=1)
+
+        self.assertEqual(results[0]['status'], 'exists')
+        self.assertEqual(User.objects.filter(email__iexact='taken@example.com').count(), 1)
+
+    def test_values_longer_than_their_columns_are_invalid(self):
+        rows = [
+            {'name': 'n' * 101, 'email': 'long-name@example.com', 'password': 'pw'},
+            {'name': 'Long email', 'email': 'e' * 243 + '@example.com', 'password': 'pw'},
+            {'name': 'n' * 100, 'email': 'e' * 242 + '@example.com', 'password': 'pw'},
+        ]
+
+        results = provisioning.provision_users(rows, workers=1)
+
+        self.assertEqual([result['status'] for result in results], ['invalid', 'invalid', 'created'])
+        self.assertEqual(results[0]['errors'], ["name must be at most 100 characters"])
+        self.assertEqual(results[1]['errors'], ["email must be at most 254 characters"])
+
+    def test_row_that_loses_an_insert_race_is_not_reported_created(self):
+        rows = [
+            {'name': 'Raced', 'email': 'raced@example.com', 'password': 'pw'},
+            {'name': 'Fine', 'email': 'fine@example.com', 'password': 'pw'},
+        ]
+        hash_passwords = provisioning.hash_passwords
+
+        def insert_during_hashing(passwords, workers):
+            # Another request takes the address between the existence check and the insert
+            User.objects.create_user(email='raced@example.com', password='other', name='Other')
+            return hash_passwords(passwords, workers)
+
+        with mock.patch.object(provisioning, 'hash_passwords', side_effect=insert_during_hashing):
+            results = provisioning.provision_users(rows, workers=1)
+
+        self.assertEqual([result['status'] for result in results], ['exists', 'created'])
+        self.assertNotIn('id', results[0])
+        self.assertEqual(User.objects.get(email='raced@example.com').name, 'Other')
+
+
+class ProvisionHashingPoolTests(TestCase):
+    """ Real process pool; the workers use the project's own password hasher. """
+
+    def test_pool_hashes_every_password(self):
+        rows = [
+            {'name': f'Pooled {i}', 'email': f'pooled{i}@example.com', 'password': f'secret-{i}'}
+            for i in range(hashing.PARALLEL_THRESHOLD)
+        ]
+
+        results = provisioning.provision_users(rows, workers=2)
+
+        self.assertEqual([result['status'] for result in results], ['created'] * len(rows))
+        users = {user.email: user for user in User.objects.filter(email__startswith='pooled')}
+        self.assertEqual(len({user.password for user in users.values()}), len(rows))
+        for i in (0, len(rows) - 1):
+            self.assertTrue(users[f'pooled{i}@example.com'].check_password(f'secret-{i}'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AdminUserBulkProvisionTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user(email='bulk-admin@example.com', password='pw', name='Admin', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('admin-user-bulk-provision')
+
+    def post_csv(self, text):
+        return self.client.post(self.url, text, content_type='text/csv')
+
+    def test_csv_body(self):
+        response = self.post_csv(
+            'name,email,password,role\n'
+            'Ann,ann@example.com,pw,\n'
+            'Bob,bob@example.com,pw,admin\n'
+            'Admin again,BULK-ADMIN@example.com,pw,\n'
+            ',not-an-email,,\n'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']], ['created', 'created', 'exists', 'invalid']
+        )
+        self.assertEqual(User.objects.get(email='bob@example.com').role, 'ADMIN')
+
+    @override_settings(BULK_PROVISION_MAX_ROWS=2)
+    def test_row_cap(self):
+        response = self.post_csv('name,email,password\n' + ''.join(f'U{i},u{i}@example.com,pw\n' for i in range(3)))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('manage.py provision_users', response.data['detail'])
+        self.assertFalse(User.objects.filter(email__startswith='u0').exists())
+
+    def test_unreadable_body(self):
+        response = self.client.post(self.url, b'\xff\xfe', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, 400)
+
+    def test_admins_only(self):
+        author = User.objects.create_user(email='bulk-author@example.com', password='pw', name='Author')
+        self.client.force_authenticate(author)
+
+        self.assertEqual(self.post_csv('name,email,password\nA,a@example.com,pw\n').status_code, 403)
 
-# Create your tests here.
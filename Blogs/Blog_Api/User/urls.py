@@ -3,7 +3,8 @@ from django.urls import path
 from . import views
 from .views import (
     register_user, login_user,
-    AdminUserListView, AdminUserRoleUpdateView, UserCountView
+    AdminUserListView, AdminUserRoleUpdateView, UserCountView, AdminUserPurgeView,
+    AdminUserBulkProvisionView
 )
 
 urlpatterns = [
@@ -17,4 +18,6 @@ urlpatterns = [
     path('admin/users/', AdminUserListView.as_view(), name='admin-user-list'),
     path('admin/users/<int:pk>/role/', AdminUserRoleUpdateView.as_view(), name='admin-user-role-update'),
     path('admin/users/count/', views.UserCountView.as_view(), name='user-count'),
+    path('admin/users/bulk/', AdminUserBulkProvisionView.as_view(), name='admin-user-bulk-provision'),
+    path('admin/users/<int:pk>/purge/', AdminUserPurgeView.as_view(), name='admin-user-purge'),
 ]
\ No newline at end of file
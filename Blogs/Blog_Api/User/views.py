@@ -1,4 +1,5 @@
 # users/views.py
+import csv
 import jwt
 from datetime import datetime, timedelta
 from django.conf import settings
@@ -17,10 +18,13 @@ from django.contrib.auth import get_user_model
 from User.permissions import IsAdminUser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import generics
+from django.shortcuts import get_object_or_404
 
 from .serializers import UserRegistrationSerializer, UserSerializer, UserRoleUpdateSerializer
 from .models import User
 from .permissions import IsAdminUser
+from .purge import request_purge, remaining_posts, purge_is_running, purge_user_in_background, completed_purge
+from .provisioning import parse_rows, provision_users
 
 # Helper function to generate JWT
 def get_jwt_token(user):
@@ -183,6 +187,100 @@ class AdminUserRoleUpdateView(generics.UpdateAPIView):
             "newRole": new_role
         }, status=status.HTTP_200_OK)
         
+class AdminUserPurgeView(APIView):
+    """
+    POST /api/admin/users/{id}/purge/ - Deactivate a user now and delete them and their posts in batches.
+    GET  /api/admin/users/{id}/purge/ - Purge progress; "done" once the user and all their posts are gone.
+    404 for an id that never belonged to a purged user.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, pk, format=None):
+        user = User.objects.filter(pk=pk).first()
+        if user is None:
+            purge = completed_purge(pk)
+            if purge is None:
+                return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+            # The purge deletes the user last, so nothing of theirs is left
+            return Response({
+                "userId": purge.user_id,
+                "status": "done",
+                "purgeRequestedAt": purge.purge_requested_at,
+                "completedAt": purge.completed_at,
+                "remainingPosts": remaining_posts(purge.user_id)
+            })
+
+        return Response({
+            "userId": user.id,
+            "status": "inProgress" if user.purge_requested_at else "notRequested",
+            "isActive": user.is_active,
+            "purgeRequestedAt": user.purge_requested_at,
+            "remainingPosts": remaining_posts(user.id)
+        })
+
+    def post(self, request, pk, format=None):
+        user = get_object_or_404(User, pk=pk)
+        if user.id == request.user.id:
+            return Response({"detail": "You cannot purge your own account"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if user.purge_requested_at and purge_is_running(user.id):
+            return Response({
+                "message": "Purge already in progress",
+                "userId": user.id,
+                "remainingPosts": remaining_posts(user.id)
+            }, status=status.HTTP_202_ACCEPTED)
+
+        request_purge(user)
+        post_count = remaining_posts(user.id)
+        # Runs in batches; `manage.py purge_users` resumes it if this worker goes away
+        purge_user_in_background(user.id)
+
+        return Response({
+            "message": "User deactivated; purge started",
+            "userId": user.id,
+            "remainingPosts": post_count
+        }, status=status.HTTP_202_ACCEPTED)
+
+class AdminUserBulkProvisionView(APIView):
+    """
+    POST /api/admin/users/bulk/ - Create many users from CSV or NDJSON.
+    Send the file as the raw body (Content-Type text/csv or application/x-ndjson)
+    or as a multipart upload named "file". Returns one result per row.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    BODY_FORMATS = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/ndjson': 'ndjson'}
+
+    def post(self, request, format=None):
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type in self.BODY_FORMATS:
+            fmt, raw = self.BODY_FORMATS[content_type], request.body
+        elif 'file' in request.FILES:
+            upload = request.FILES['file']
+            fmt = request.data.get('format') or ('csv' if upload.name.lower().endswith('.csv') else 'ndjson')
+            raw = upload.read()
+        else:
+            return Response(
+                {"detail": "Send a CSV or NDJSON body, or a multipart upload named 'file'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            rows = parse_rows(raw.decode('utf-8-sig'), fmt)
+        except (UnicodeDecodeError, ValueError, csv.Error) as exc:
+            return Response({"detail": f"Could not read file: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(rows) > settings.BULK_PROVISION_MAX_ROWS:
+            return Response(
+                {"detail": f"At most {settings.BULK_PROVISION_MAX_ROWS} rows per request; use manage.py provision_users"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = provision_users(rows)
+        return Response({
+            "created": sum(1 for result in results if result['status'] == 'created'),
+            "results": results
+        }, status=status.HTTP_200_OK)
+
 class UserCountView(APIView):
     """ GET /api/admin/users/count/ - Returns the total user count. """
     permission_classes = [IsAuthenticated, IsAdminUser] # Restrict to logged-in Admins
@@ -0,0 +1,67 @@
+"""
+Gunicorn config for Blog_Api.
+
+Run from the directory containing manage.py:
+
+    gunicorn -c gunicorn.conf.py
+
+The app is preloaded in the master so workers share its memory
+copy-on-write. Everything can be overridden through the environment:
+
+    GUNICORN_WORKER_CLASS   sync (default), gthread, or asgi (uvicorn worker)
+    GUNICORN_BIND           default 0.0.0.0:8000
+    GUNICORN_WORKERS        default 2 * CPUs + 1
+    GUNICORN_THREADS        threads per gthread worker, default 4
+    GUNICORN_MAX_REQUESTS   requests before a worker is recycled, default 1000 (0 disables)
+    GUNICORN_TIMEOUT        default 30 seconds
+"""
+import multiprocessing
+import os
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'asgi': 'uvicorn_worker.UvicornWorker',
+}
+
+_worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+if _worker_class not in WORKER_CLASSES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}")
+
+worker_class = WORKER_CLASSES[_worker_class]
+wsgi_app = 'Blog_Api.asgi:application' if _worker_class == 'asgi' else 'Blog_Api.wsgi:application'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+if _worker_class == 'gthread':
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import Django, settings, apps and URLconf once in the master
+preload_app = True
+
+# Recycle workers to cap slow memory growth; jitter keeps them from restarting together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+
+# Heartbeat files on tmpfs avoid worker stalls on slow disks
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def post_fork(server, worker):
+    # DB connections opened while preloading must not be shared between processes
+    from django.db import connections
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    # Write out view counts still buffered in this worker
+    from Post.counters import flush_views
+    try:
+        flush_views()
+    except Exception:
+        server.log.exception("Failed to flush view counts for worker %s", worker.pid)